@@ -1,26 +1,115 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, Response, stream_with_context, render_template, request, redirect, url_for, flash, jsonify, g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
-import smtplib
+import atexit
+import hmac
+import uuid
 from email.mime.text import MIMEText
 import os
 from dotenv import load_dotenv
-import csv
+import json
+import time
 import re
-
-from fsm import TaskReminderFSM
+from operator import itemgetter
+
+import click
+
+import fsm
+from reminder_engine import ReminderEngine
+from mailer import SMTPConnectionPool, RateLimiter, MailProvider, NotAttempted, OutboxWorkerPool, retry_delay
+from schema import upgrade_schema
+from stats import StatsCache, stats_key
+from cache import TTLCache
+from notify import NotificationBroker, StreamLimitReached, make_notification_channel
+from dedupe import make_dedupe_store
+from leader import LeaderElection
+from recurrence import REPEATS, next_occurrence, occurrences_between
+from exporter import EXPORT_FORMATS, parse_columns, export_chunks, gzip_chunks
+from importer import iter_records, validate_record
+from keywords import KeywordConfig, HIGH_WEIGHT, MEDIUM_WEIGHT
+from transitions import TransitionLog, compact, replay, average_time_between
+from archive import move_chunk, enable_incremental_vacuum, incremental_vacuum
+from search import fts_available, match_expression, ranked_matches
+from pagination import decode_cursor, keyset_page
+from bulk import bulk_transition, bulk_delete
+from hashing import PasswordHasher, PasswordHasherBusy
+from db_profile import database_uri, engine_options, configure_engine, create_read_engine, create_shard_engine
+from sharding import (ShardRouter, ShardMoving, ShardedSession, FlaskShardedSession, seed_id_range,
+                      seed_directory, split_shard, purge_strays)
 
 load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = 'secret123'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+# SQLite in the instance folder by default; DATABASE_URL may point at PostgreSQL instead
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(os.getenv('DATABASE_URL', 'sqlite:///database.db'))
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', '5'))  # connections per primary engine
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'],
+                                                         pool_size=app.config['DB_POOL_SIZE'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+app.config['DATABASE_READ_URL'] = os.getenv('DATABASE_READ_URL')  # optional replica for read-heavy routes
+app.config['DB_READ_POOL_SIZE'] = int(os.getenv('DB_READ_POOL_SIZE', '8'))  # read-only connections
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))  # ms to wait for a lock
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))  # page cache per connection
+app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # bytes
+# Per-user shards: comma-separated extra databases for task data; shard 0 is always the main database
+app.config['SHARD_URLS'] = [url.strip() for url in os.getenv('SHARD_URLS', '').split(',') if url.strip()]
+app.config['SHARD_BUCKETS'] = int(os.getenv('SHARD_BUCKETS', '256'))  # user_id buckets, fixed once data exists
+app.config['SHARD_DIRECTORY_TTL'] = float(os.getenv('SHARD_DIRECTORY_TTL', '1.0'))  # seconds a bucket map is trusted
+# Finished tasks are moved to a separate database so live queries stay small
+app.config['SQLALCHEMY_BINDS'] = {'archive': os.getenv('ARCHIVE_DATABASE_URI', 'sqlite:///archive.db')}
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', '30'))  # days since last change
+app.config['ARCHIVE_CHUNK_SIZE'] = int(os.getenv('ARCHIVE_CHUNK_SIZE', '500'))  # rows moved per transaction
+app.config['REMINDER_MAX_LATENCY'] = float(os.getenv('REMINDER_MAX_LATENCY', '1.0'))  # seconds
+app.config['STATS_CACHE_SIZE'] = int(os.getenv('STATS_CACHE_SIZE', '1024'))  # users
+app.config['STATS_CACHE_TTL'] = int(os.getenv('STATS_CACHE_TTL', '300'))  # seconds
+app.config['SSE_HEARTBEAT'] = int(os.getenv('SSE_HEARTBEAT', '15'))  # seconds between keep-alive comments
+app.config['SSE_RETRY_MS'] = int(os.getenv('SSE_RETRY_MS', '3000'))  # client reconnect delay
+app.config['SSE_BUFFER_SIZE'] = int(os.getenv('SSE_BUFFER_SIZE', '100'))  # events buffered per connection
+# Each open stream holds a worker thread; beyond this many per process, tabs poll instead
+app.config['SSE_MAX_STREAMS'] = int(os.getenv('SSE_MAX_STREAMS', '16'))
+# 'memory' (single process) or 'sqlite:///path' so every worker's streams see every reminder
+app.config['NOTIFY_CHANNEL'] = os.getenv('NOTIFY_CHANNEL', f"sqlite:///{os.path.join(app.instance_path, 'notify.db')}")
+app.config['NOTIFY_POLL_INTERVAL'] = float(os.getenv('NOTIFY_POLL_INTERVAL', '0.5'))  # seconds between channel reads
+# 'memory' (single process) or 'sqlite:///path' shared by every worker on the host
+app.config['DEDUPE_STORE'] = os.getenv('DEDUPE_STORE', f"sqlite:///{os.path.join(app.instance_path, 'dedupe.db')}")
+app.config['DEDUPE_TTL'] = int(os.getenv('DEDUPE_TTL', '86400'))  # seconds a delivery is remembered
+app.config['SCHEDULER_LEASE_TTL'] = int(os.getenv('SCHEDULER_LEASE_TTL', '30'))  # seconds before failover
+app.config['SCHEDULER_HEARTBEAT'] = int(os.getenv('SCHEDULER_HEARTBEAT', '10'))  # seconds between renewals
+app.config['TRANSITION_LOG_RETENTION'] = int(os.getenv('TRANSITION_LOG_RETENTION', '90'))  # days before compaction
+app.config['TASKS_PAGE_SIZE'] = int(os.getenv('TASKS_PAGE_SIZE', '50'))  # rows per /tasks page
+app.config['PASSWORD_HASH_ITERATIONS'] = int(os.getenv('PASSWORD_HASH_ITERATIONS', '600000'))  # pbkdf2-sha256 rounds
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))  # processes, 0 = hash inline
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '16'))  # queued before 429
+app.config['SESSION_USER_CACHE_SIZE'] = int(os.getenv('SESSION_USER_CACHE_SIZE', '4096'))  # users
+app.config['SESSION_USER_CACHE_TTL'] = int(os.getenv('SESSION_USER_CACHE_TTL', '300'))  # seconds
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')  # bearer token for /metrics scrapers; unset = login
+
+# Task queries go to the signed-in user's shard; db.session and read_session route them
+shards = ShardRouter(buckets=app.config['SHARD_BUCKETS'], refresh=app.config['SHARD_DIRECTORY_TTL'])
+db = SQLAlchemy(app, session_options={'class_': FlaskShardedSession, 'router': shards})
+
+# WAL + busy timeout on every SQLite engine; read-heavy routes get their own read-only pool
+SQLITE_PRAGMAS = {
+    'busy_timeout': app.config['SQLITE_BUSY_TIMEOUT'],
+    'cache_size_kb': app.config['SQLITE_CACHE_SIZE_KB'],
+    'mmap_size': app.config['SQLITE_MMAP_SIZE'],
+}
+with app.app_context():
+    for engine in db.engines.values():
+        configure_engine(engine, **SQLITE_PRAGMAS)
+    read_engine = create_read_engine(db.engine, app.config['DATABASE_READ_URL'],
+                                     pool_size=app.config['DB_READ_POOL_SIZE'], **SQLITE_PRAGMAS)
+    archive_engine = db.engines['archive']
+    shards.add(db.engine, read_engine)
+    for url in app.config['SHARD_URLS']:
+        shard_engine = create_shard_engine(url, app.instance_path, app.config['DB_POOL_SIZE'], **SQLITE_PRAGMAS)
+        shards.add(shard_engine, create_read_engine(shard_engine, pool_size=app.config['DB_READ_POOL_SIZE'],
+                                                    **SQLITE_PRAGMAS))
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -28,6 +117,22 @@ login_manager.login_view = 'login'
 EMAIL_USER = os.getenv('EMAIL_USER')
 EMAIL_PASS = os.getenv('EMAIL_PASS')
 EMAIL_TO = os.getenv('EMAIL_TO')
+EMAIL_FROM = os.getenv('EMAIL_FROM') or EMAIL_USER
+
+# Outgoing mail provider and outbox worker settings
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '465'))
+SMTP_SSL = os.getenv('SMTP_SSL', '1') == '1'
+SMTP_RATE = float(os.getenv('SMTP_RATE', '5'))  # messages per second, 0 = unlimited
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', '2'))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))  # rows fetched per cursor batch
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '1000'))  # rows inserted per transaction
+IMPORT_MAX_ERRORS = 1000  # per-row errors reported back in detail
+BULK_MAX_IDS = int(os.getenv('BULK_MAX_IDS', '5000'))  # ids accepted per bulk request
 
 
 # Models
@@ -57,46 +162,300 @@ class User(db.Model):
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(200), nullable=False)
-    remind_time = db.Column(db.String(20), nullable=False)
+    remind_time = db.Column(db.DateTime, nullable=False)
     reminder_offset = db.Column(db.Integer, default=5)
     status = db.Column(db.String(20), default='Pending')
     priority = db.Column(db.String(20), default='Medium')  # High, Medium, Low
+    importance = db.Column(db.Integer)  # highest priority-keyword weight in the description
     repeat = db.Column(db.String(20), default='once')  # once, daily, weekly, monthly
+    series_start = db.Column(db.DateTime)  # first occurrence of a recurring series (the rule's anchor)
     alert_type = db.Column(db.String(20), default='both')  # email, browser, both
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     fsm_state = db.Column(db.String(50), default='Idle')
-    created_at = db.Column(db.String(20), default=lambda: datetime.now().strftime("%Y-%m-%d %H:%M"))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now().replace(second=0, microsecond=0))
+    reminder_at = db.Column(db.DateTime)  # remind_time - reminder_offset, kept in sync on every write
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    occurrences = db.relationship('TaskOccurrence', backref='task', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Due-time indexes: the scheduler only ever looks at Pending rows inside a time window
+        db.Index('ix_task_status_reminder_at', 'status', 'reminder_at'),
+        db.Index('ix_task_status_remind_time', 'status', 'remind_time'),
+        # Per-user listing, filtering and date-range queries
+        db.Index('ix_task_user_status_remind_time', 'user_id', 'status', 'remind_time'),
+        db.Index('ix_task_user_status_reminder_at', 'user_id', 'status', 'reminder_at'),  # browser check
+        db.Index('ix_task_user_priority', 'user_id', 'priority'),
+        db.Index('ix_task_user_remind_time', 'user_id', 'remind_time'),
+        # Covers the dashboard's grouped counts without touching the table
+        db.Index('ix_task_user_breakdown', 'user_id', 'status', 'priority', 'repeat'),
+        # Archival scan for finished tasks
+        db.Index('ix_task_status_updated_at', 'status', 'updated_at'),
+        # Ids are never reused; each shard's sequence starts at its own range (sharding.SHARD_ID_SPAN)
+        {'sqlite_autoincrement': True},
+    )
+
+    def stats_key(self):
+        """Where this task is counted in the per-user dashboard counters"""
+        return stats_key(self.status, self.priority, self.repeat, self.remind_time)
+
+
+class ArchivedTask(db.Model):
+    """Finished task moved out of the live table; same columns as Task, kept in the archive database"""
+    __bind_key__ = 'archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    remind_time = db.Column(db.DateTime, nullable=False)
+    reminder_offset = db.Column(db.Integer)
+    status = db.Column(db.String(20))
+    priority = db.Column(db.String(20))
+    importance = db.Column(db.Integer)
+    repeat = db.Column(db.String(20))
+    series_start = db.Column(db.DateTime)
+    alert_type = db.Column(db.String(20))
+    user_id = db.Column(db.Integer, nullable=False)  # no FK: users live in the main database
+    fsm_state = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime)
+    reminder_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_archived_task_user', 'user_id', 'id'),
+        db.Index('ix_archived_task_user_breakdown', 'user_id', 'status', 'priority', 'repeat'),
+    )
+
+
+class TaskOccurrence(db.Model):
+    """Exception row for one occurrence of a recurring task; only completions are stored"""
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
+    occurrence_time = db.Column(db.DateTime, nullable=False)  # scheduled time of the occurrence
+    status = db.Column(db.String(20), nullable=False, default='Completed')
+    completed_at = db.Column(db.DateTime, default=datetime.now)
+
+    __table_args__ = (
+        db.UniqueConstraint('task_id', 'occurrence_time', name='uq_task_occurrence'),
+    )
+
+
+class ArchivedTaskOccurrence(db.Model):
+    """Completed occurrence of an archived recurring task; same columns as TaskOccurrence"""
+    __bind_key__ = 'archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    task_id = db.Column(db.Integer, nullable=False)  # no FK: archived_task is keyed by the live id
+    occurrence_time = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    completed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_archived_task_occurrence_task', 'task_id', 'occurrence_time'),
+    )
+
+
+class TaskTransition(db.Model):
+    """Append-only FSM transition log; rows are never updated, only compacted into snapshots"""
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)  # no FK: history outlives deleted tasks
+    from_state = db.Column(db.String(50), nullable=False)
+    event = db.Column(db.String(50), nullable=False)
+    to_state = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Replay one task's history in order
+        db.Index('ix_task_transition_task', 'task_id', 'id'),
+        # "Time from state A to state B" queries: a (to_state, created_at) range scan
+        db.Index('ix_task_transition_state_time', 'to_state', 'created_at'),
+        db.Index('ix_task_transition_created_at', 'created_at'),
+    )
+
+
+class TaskStateSnapshot(db.Model):
+    """Compacted transition history: a task's state as of the last folded log row"""
+    task_id = db.Column(db.Integer, primary_key=True)
+    state = db.Column(db.String(50), nullable=False)
+    entered_at = db.Column(db.DateTime, nullable=False)
+    last_log_id = db.Column(db.Integer, nullable=False)
+    transitions = db.Column(db.Integer, nullable=False)  # log rows folded into this snapshot
+
+
+class SchedulerState(db.Model):
+    """Small key/value store for scheduler bookkeeping (e.g. the reminder watermark)"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(50))
+
+
+class SchedulerLease(db.Model):
+    """Named lease held by the process currently allowed to run leader-only jobs"""
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class ShardBucket(db.Model):
+    """Shard directory: which shard holds the tasks of the users in each user_id bucket"""
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)  # user_id % SHARD_BUCKETS
+    shard = db.Column(db.Integer, nullable=False)
+    moving = db.Column(db.Boolean, nullable=False, default=False)  # writes paused while the bucket is copied
+
+
+class EmailOutbox(db.Model):
+    """Queued outgoing email; the reminder job only inserts rows, outbox workers send them"""
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(150), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='queued')  # queued, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.now)
+    claimed_by = db.Column(db.String(36))
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+# Stored on the user's shard; users, scheduler state and the outbox stay in the main database
+SHARDED_TABLES = (Task.__table__, TaskOccurrence.__table__, TaskTransition.__table__, TaskStateSnapshot.__table__)
+# Rows that move with their task between shards: (table, task_id column, values replaced on copy)
+SHARDED_CHILDREN = [
+    (TaskOccurrence.__table__, TaskOccurrence.__table__.c.task_id, {}),
+    (TaskTransition.__table__, TaskTransition.__table__.c.task_id, {}),
+    (TaskStateSnapshot.__table__, TaskStateSnapshot.__table__.c.task_id, {'last_log_id': 0}),  # log ids change on copy
+]
+
+
+class SessionUser:
+    """
+    Read-only identity record used as current_user after login. It holds no
+    session or relationships, so one instance can be cached and shared by
+    every request and thread in the process.
+    """
+
+    __slots__ = ('id', 'username', 'email')
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, email):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'username', username)
+        object.__setattr__(self, 'email', email)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SessionUser is read-only")
+
+    def get_id(self):
+        return str(self.id)
+
+
+# Per-process cache in front of load_user; the TTL bounds staleness across workers
+session_users = TTLCache(maxsize=app.config['SESSION_USER_CACHE_SIZE'], ttl=app.config['SESSION_USER_CACHE_TTL'])
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    user_id = int(user_id)
+    user = session_users.get(user_id)
+    if user is None:
+        row = db.session.execute(
+            db.select(User.id, User.username, User.email).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        user = SessionUser(*row)
+        session_users.set(user_id, user)
+    return user
+
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def invalidate_session_user(mapper, connection, target):
+    session_users.invalidate(target.id)
+
+
+@app.before_request
+def select_shard():
+    """Route this request's task queries to the signed-in user's shard"""
+    if not shards.sharded or not current_user.is_authenticated:
+        return None
+    try:
+        g.shard_token = shards.enter(shards.shard_of_user(current_user.id))
+    except ShardMoving:
+        return jsonify(error="Your tasks are being moved, please retry in a few seconds."), 503, {'Retry-After': '5'}
 
 
-# Initialize FSM
-fsm = TaskReminderFSM()
+@app.teardown_request
+def release_shard(exc):
+    token = g.pop('shard_token', None)
+    if token is not None:
+        shards.leave(token)
+
+
+# pbkdf2 runs in worker processes so a burst of logins cannot stall every other route
+password_hasher = PasswordHasher(
+    iterations=app.config['PASSWORD_HASH_ITERATIONS'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING']
+)
+app.extensions['password_hasher'] = password_hasher  # also used by the auth blueprint
+
+
+def hasher_busy(template):
+    flash("Too many sign-ins right now, please try again in a moment.", "warning")
+    return render_template(template), 429, {'Retry-After': '2'}
+
+
+# Per-user dashboard counters, updated incrementally on every task change
+# Sessions for read-only routes; all writes go through db.session and the primary engine
+read_session = sessionmaker(class_=ShardedSession, router=shards, read_only=True,
+                            bind=read_engine, binds={ArchivedTask.__table__: archive_engine})
+
+user_stats = StatsCache(
+    lambda: db.session,
+    Task.__table__,
+    maxsize=app.config['STATS_CACHE_SIZE'],
+    ttl=app.config['STATS_CACHE_TTL'],
+    archive=ArchivedTask.__table__,
+    scope=lambda user_id: shards.using_user(user_id, writing=False)
+)
+
+
+def reconcile_user_stats():
+    with app.app_context():
+        user_stats.reconcile()
 
 
 # Smart Task Prioritization
-def calculate_priority(description, remind_time):
+# Keyword analysis for importance - weighted keywords compiled into one Aho-Corasick automaton
+priority_keywords = KeywordConfig(os.getenv('PRIORITY_KEYWORDS_FILE'))  # optional JSON keyword list
+
+
+def keyword_importance(description, automaton=None):
+    """Highest keyword weight found in a description (HIGH_WEIGHT, MEDIUM_WEIGHT or 0)"""
+    return (automaton or priority_keywords.automaton()).max_weight(description)
+
+
+def calculate_priority(description, remind_time, now=None, importance=None):
     """
     Automatically assigns priority based on:
     1. Time until deadline (urgency)
     2. Keywords in description (importance)
     """
     try:
-        task_time = datetime.strptime(remind_time, "%Y-%m-%d %H:%M")
-        time_diff = task_time - datetime.now()
+        time_diff = remind_time - (now or datetime.now())
         hours_until = time_diff.total_seconds() / 3600
 
-        # Keyword analysis for importance
-        high_keywords = ['urgent', 'critical', 'important', 'asap', 'emergency', 'deadline', 'exam', 'interview',
-                         'meeting']
-        medium_keywords = ['task', 'assignment', 'project', 'work', 'study', 'call', 'email']
-
-        description_lower = description.lower()
-        has_high_keyword = any(keyword in description_lower for keyword in high_keywords)
-        has_medium_keyword = any(keyword in description_lower for keyword in medium_keywords)
+        if importance is None:
+            importance = keyword_importance(description)
+        has_high_keyword = importance >= HIGH_WEIGHT
+        has_medium_keyword = importance >= MEDIUM_WEIGHT
 
         # Priority logic
         if hours_until < 24:  # Less than 24 hours
@@ -119,102 +478,666 @@ def calculate_priority(description, remind_time):
         return 'Medium'
 
 
+def calculate_priorities(tasks, now=None):
+    """
+    Score a batch of (description, remind_time) pairs against a single clock reading.
+
+    Returns:
+        list of (priority, importance) tuples
+    """
+    now = now or datetime.now()
+    automaton = priority_keywords.automaton()
+    scored = []
+    for description, remind_time in tasks:
+        importance = keyword_importance(description, automaton)
+        scored.append((calculate_priority(description, remind_time, now, importance), importance))
+    return scored
+
+
+def compute_reminder_at(remind_time, reminder_offset):
+    """Precompute when the reminder for a deadline should fire"""
+    return remind_time - timedelta(minutes=reminder_offset or 0)
+
+
+# Leader election - only the lease holder runs the periodic jobs
+def acquire_scheduler_lease(holder):
+    """Take or renew the scheduler lease if it is free, expired or already ours"""
+    with app.app_context():
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=app.config['SCHEDULER_LEASE_TTL'])
+        renewed = SchedulerLease.query.filter(
+            SchedulerLease.name == 'scheduler',
+            db.or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now)
+        ).update({SchedulerLease.holder: holder, SchedulerLease.expires_at: expires_at},
+                 synchronize_session=False)
+        if renewed:
+            db.session.commit()
+            return True
+
+        try:
+            db.session.add(SchedulerLease(name='scheduler', holder=holder, expires_at=expires_at))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()  # Someone else holds a live lease
+            return False
+
+
+def release_scheduler_lease(holder):
+    with app.app_context():
+        SchedulerLease.query.filter_by(name='scheduler', holder=holder).delete()
+        db.session.commit()
+
+
+scheduler_leader = LeaderElection(acquire_scheduler_lease, release_scheduler_lease)
+
+
 # Email notification
 def send_email_reminder(task_desc, user_email):
-    msg = MIMEText(f"Reminder: {task_desc}")
-    msg['Subject'] = "Task Reminder"
-    msg['From'] = EMAIL_USER
-    msg['To'] = user_email
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.sendmail(EMAIL_USER, [user_email], msg.as_string())
-        print(f"✅ Email sent for: {task_desc}")
-    except Exception as e:
-        print(f"❌ Email failed for {task_desc}: {e}")
+    """Queue a reminder email; it goes out once the caller commits the session"""
+    db.session.add(EmailOutbox(
+        recipient=user_email,
+        subject="Task Reminder",
+        body=f"Reminder: {task_desc}"
+    ))
 
 
-# Check reminders scheduler
-def check_reminders():
+mail_provider = MailProvider(
+    SMTPConnectionPool(SMTP_HOST, SMTP_PORT, EMAIL_USER, EMAIL_PASS, use_ssl=SMTP_SSL, size=SMTP_POOL_SIZE),
+    RateLimiter(SMTP_RATE)
+)
+
+
+def process_outbox_batch():
+    """
+    Claim a batch of due outbox rows, send them over pooled connections and
+    record the outcome. Rows stay claimed ('sending') for a lease period so a
+    crashed worker's batch is picked up again later.
+    """
     with app.app_context():
         now = datetime.now()
-        tasks = Task.query.filter(Task.status == 'Pending').all()
+        claim = str(uuid.uuid4())
+        ids = [row_id for (row_id,) in db.session.query(EmailOutbox.id).filter(
+            EmailOutbox.status.in_(['queued', 'sending']),
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at).limit(OUTBOX_BATCH_SIZE)]
+        if not ids:
+            return 0
+
+        EmailOutbox.query.filter(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.status.in_(['queued', 'sending']),
+            EmailOutbox.next_attempt_at <= now
+        ).update({
+            EmailOutbox.status: 'sending',
+            EmailOutbox.claimed_by: claim,
+            EmailOutbox.next_attempt_at: now + timedelta(minutes=10)
+        }, synchronize_session=False)
+        db.session.commit()
+
+        batch = EmailOutbox.query.filter_by(claimed_by=claim, status='sending').all()
+        if not batch:
+            return 0  # Another worker claimed these rows first
+        messages = []
+        for item in batch:
+            msg = MIMEText(item.body)
+            msg['Subject'] = item.subject
+            msg['From'] = EMAIL_FROM
+            msg['To'] = item.recipient
+            messages.append((item.id, EMAIL_FROM, item.recipient, msg.as_string()))
+        db.session.commit()  # Release the DB connection while talking to SMTP
+
+        results = mail_provider.send_batch(messages)
+
+        sent_at = datetime.now()
+        for item in batch:
+            error = results.get(item.id, NotAttempted("not attempted", retry_delay(1)))
+            if isinstance(error, NotAttempted):
+                # The batch stopped before this message (provider unreachable): not its failure
+                item.status = 'queued'
+                item.last_error = error[:500]
+                item.next_attempt_at = sent_at + timedelta(seconds=error.retry_after)
+                continue
+            item.attempts += 1
+            if error is None:
+                item.status = 'sent'
+                item.sent_at = sent_at
+                item.last_error = None
+            elif item.attempts >= OUTBOX_MAX_ATTEMPTS:
+                item.status = 'failed'
+                item.last_error = error[:500]
+                print(f"❌ Email to {item.recipient} failed permanently: {error}")
+            else:
+                item.status = 'queued'
+                item.last_error = error[:500]
+                item.next_attempt_at = sent_at + timedelta(seconds=retry_delay(item.attempts))
+        db.session.commit()
+
+        sent = sum(1 for error in results.values() if error is None)
+        print(f"✅ Outbox batch: {sent}/{len(batch)} emails sent")
+        return len(batch)
+
+
+outbox_workers = OutboxWorkerPool(scheduler_leader.leader_only(process_outbox_batch), workers=OUTBOX_WORKERS)
+
+
+# Reminder engine - fires reminders from an in-memory due-queue
+def reminder_due_timestamp(reminder_at):
+    return reminder_at.timestamp()
+
 
-        for task in tasks:
-            task_time = datetime.strptime(task.remind_time, "%Y-%m-%d %H:%M")
+def get_scheduler_state(name, default=None):
+    state = db.session.get(SchedulerState, name)
+    return state.value if state else default
 
-            # Calculate reminder time (task_time - offset)
-            reminder_time = task_time - timedelta(minutes=task.reminder_offset)
 
-            # Check if it's time to send reminder (within the current minute)
-            if now.strftime("%Y-%m-%d %H:%M") == reminder_time.strftime("%Y-%m-%d %H:%M"):
+def set_scheduler_state(name, value):
+    state = db.session.get(SchedulerState, name)
+    if state:
+        state.value = value
+    else:
+        db.session.add(SchedulerState(name=name, value=value))
+
+
+def load_pending_reminders():
+    """Reminders still to fire on every shard, including any missed since each shard's watermark"""
+    return [item for items in shards.sweep(load_shard_reminders).values() for item in items]
+
+
+def load_shard_reminders():
+    with app.app_context():
+        now = datetime.now()
+        watermark = get_scheduler_state(shards.state_key('reminder_watermark'))
+        if watermark is None:
+            # First run: behave like the old per-minute check and skip reminders from the past
+            watermark = now.replace(second=0, microsecond=0) - timedelta(minutes=1)
+        else:
+            watermark = datetime.strptime(watermark, "%Y-%m-%d %H:%M")
+
+        # The watermark is shared, so another process may have moved it past a reminder that only a
+        # dead process had queued: anything unsent whose deadline is still ahead is loaded too (the
+        # delivery claim keeps it from going out twice)
+        rows = db.session.query(Task.id, Task.reminder_at).filter(
+            Task.status == 'Pending',
+            db.or_(Task.reminder_at >= watermark, Task.remind_time >= now),
+            Task.fsm_state != 'Reminder Sent'
+        ).all()
+        return [(task_id, reminder_due_timestamp(reminder_at)) for task_id, reminder_at in rows]
+
+
+def fire_reminders(due_items):
+    """Engine callback: send every reminder that just came due, one thread per shard holding them"""
+    groups = shards.by_task(due_items, itemgetter(0))
+    fired = shards.sweep(lambda: fire_shard_reminders(groups[shards.current()]), groups)
+    outbox_workers.wake()
+    for browser_notifications in fired.values():
+        for user_id, payload in browser_notifications:
+            notification_broker.publish(user_id, payload)
+
+
+def fire_shard_reminders(due_items):
+    """Send the selected shard's due reminders and advance its watermark; returns the browser notifications"""
+    with app.app_context():
+        due_by_id = dict(due_items)
+        tasks = Task.query.filter(Task.id.in_(due_by_id), Task.status == 'Pending').all()
+
+        browser_notifications = []
+        sent = []
+        claimed = []
+        try:
+            for task in tasks:
+                # Skip entries that went stale between scheduling and firing
+                if reminder_due_timestamp(task.reminder_at) != due_by_id[task.id]:
+                    continue
+
+                # Every process fires its own engine; only the one that claims the reminder sends it
+                key = delivery_key('reminder', task)
+                if not delivery_claims.claim(key):
+                    continue
+                claimed.append(key)
+
+                if task.alert_type in ['browser', 'both']:
+                    browser_notifications.append((task.user_id, notification_payload(task)))
+
                 print(f"📧 Reminder triggered for task: {task.description} ({task.reminder_offset} min before deadline)")
 
                 # Send notification based on alert_type
                 if task.alert_type in ['email', 'both']:
                     send_email_reminder(task.description, task.owner.email)
+                sent.append(task)
+
+            # Update FSM state for the whole batch at once
+            transitions = advance_fsm(sent, 'trigger_reminder')
+
+            watermark_key = shards.state_key('reminder_watermark')
+            watermark = datetime.fromtimestamp(max(due_by_id.values())).strftime("%Y-%m-%d %H:%M")
+            if watermark > get_scheduler_state(watermark_key, ''):
+                set_scheduler_state(watermark_key, watermark)
+            db.session.commit()
+        except Exception:
+            # Nothing was queued: give the claims back so the engine's retry (or another process) can send
+            db.session.rollback()
+            for key in claimed:
+                delivery_claims.release(key)
+            raise
+        transition_log.extend(transitions)
+        return browser_notifications
+
+
+def notification_payload(task):
+    return {
+        "id": task.id,
+        "description": task.description,
+        "priority": task.priority,
+        "minutes_before": task.reminder_offset
+    }
+
+
+# Reminders are published through a channel every worker polls, so a stream on any worker gets them
+notification_broker = NotificationBroker(buffer_size=app.config['SSE_BUFFER_SIZE'],
+                                         channel=make_notification_channel(app.config['NOTIFY_CHANNEL']),
+                                         poll_interval=app.config['NOTIFY_POLL_INTERVAL'],
+                                         max_connections=app.config['SSE_MAX_STREAMS'])
+
+# Shared "already delivered" claims so each reminder goes out once across all workers
+delivery_claims = make_dedupe_store(app.config['DEDUPE_STORE'], ttl=app.config['DEDUPE_TTL'])
+
+
+def delivery_key(channel, task):
+    """Claim key for one delivery; editing the reminder time makes it deliverable again"""
+    return f"{channel}:{task.id}:{task.reminder_at:%Y-%m-%dT%H:%M}"
+
+
+def schedule_task_reminder(task):
+    """Keep the engine in sync after a task was added or edited"""
+    if task.status == 'Pending' and task.reminder_at:
+        reminder_engine.schedule(task.id, reminder_due_timestamp(task.reminder_at))
+    else:
+        reminder_engine.cancel(task.id)
+
+
+reminder_engine = ReminderEngine(
+    fire_reminders,
+    loader=load_pending_reminders,
+    max_latency=app.config['REMINDER_MAX_LATENCY']
+)
+
+
+def users_in_buckets(buckets):
+    return db.session.execute(
+        db.select(User.id).where((User.id % shards.buckets).in_(buckets))
+    ).scalars().all()
+
+
+def reload_moved_reminders(buckets):
+    """
+    A bucket move gives its tasks new ids on the new shard; queue their reminders
+    again so this process's engine fires them (the old ids are skipped as stale).
+    """
+    with app.app_context():
+        user_ids = users_in_buckets(buckets)
+        by_shard = {}
+        for user_id in user_ids:
+            by_shard.setdefault(shards.shard_of_user(user_id, writing=False), []).append(user_id)
+        now = datetime.now()
+        for shard, users in by_shard.items():
+            with shards.use(shard):
+                for i in range(0, len(users), 500):
+                    reminder_engine.load((task_id, reminder_due_timestamp(reminder_at)) for task_id, reminder_at in
+                                         db.session.execute(db.select(Task.id, Task.reminder_at).where(
+                                             Task.user_id.in_(users[i:i + 500]),
+                                             Task.status == 'Pending',
+                                             Task.reminder_at >= now,
+                                             Task.fsm_state != 'Reminder Sent')))
+
 
-                # Update FSM state
-                task.fsm_state = 'Reminder Sent'
+shards.configure(SHARDED_TABLES, ShardBucket.__table__, on_move=reload_moved_reminders)
+
+
+def advance_fsm(tasks, event):
+    """
+    Validate and apply one FSM event to a batch of tasks. Tasks whose state does not
+    allow the event keep it; the scheduler still acts on them, so nothing is dropped.
+
+    Returns:
+        (task_id, from_state, event, to_state) tuples to hand to transition_log after commit
+    """
+    new_states = fsm.apply((task.fsm_state for task in tasks), event)
+    transitions = []
+    invalid = 0
+    for task, new_state in zip(tasks, new_states):
+        if new_state is None:
+            invalid += 1
+        else:
+            transitions.append((task.id, task.fsm_state, event, new_state))
+            task.fsm_state = new_state
+    if invalid:
+        print(f"[FSM] ⚠️ {invalid} task(s) could not {event} from their current state")
+    return transitions
+
+
+def creation_transitions(task_id, fsm_state):
+    """
+    Log rows for a task stored straight into `fsm_state`: the FSM's own Idle -> Task Added
+    -> Priority Assigned -> Pending path for new Pending tasks, a single row otherwise (imports)
+    """
+    if fsm_state != 'Pending':
+        return [(task_id, 'Idle', 'add_task', fsm_state)]
+    transitions, state = [], 'Idle'
+    for event in ('add_task', 'assign_priority', 'set_pending'):
+        new_state = fsm.apply([state], event)[0]
+        transitions.append((task_id, state, event, new_state))
+        state = new_state
+    return transitions
+
+
+# FSM transition log - buffered in memory and appended in batches by a background thread
+def write_transitions(rows):
+    with app.app_context():
+        for shard, batch in shards.by_task(rows, itemgetter('task_id')).items():
+            with shards.use(shard):
+                db.session.execute(db.insert(TaskTransition), batch)
                 db.session.commit()
 
-            # Check if task is overdue (past deadline and still pending)
-            elif now > task_time and task.status == 'Pending':
+
+transition_log = TransitionLog(write_transitions)
+
+
+def compact_transition_log():
+    """Fold log rows past the retention window into per-task snapshots, on every shard"""
+    shards.sweep(compact_shard_transition_log)
+
+
+def compact_shard_transition_log():
+    with app.app_context():
+        before = datetime.now() - timedelta(days=app.config['TRANSITION_LOG_RETENTION'])
+        folded = compact(db.session, TaskTransition.__table__, TaskStateSnapshot.__table__, before)
+        db.session.commit()
+        if folded:
+            print(f"[Transitions] Compacted {folded} log rows into snapshots")
+
+
+# Check reminders scheduler
+def check_reminders():
+    """
+    Marks overdue tasks using the (status, remind_time) index and moves recurring
+    series past missed occurrences, on all shards in parallel. Reminders themselves
+    are fired by the reminder engine.
+    """
+    shards.sweep(check_shard_reminders)
+
+
+def check_shard_reminders():
+    with app.app_context():
+        now = datetime.now()
+
+        # Overdue tasks (deadline minute has passed and still pending)
+        overdue_tasks = Task.query.filter(
+            Task.status == 'Pending',
+            Task.remind_time < now.replace(second=0, microsecond=0)
+        ).all()
+
+        stat_changes = []
+        missed, advanced = [], []
+        for task in overdue_tasks:
+            before = task.stats_key()
+            # Recurring tasks are one row per series: move it to the next occurrence
+            if task.repeat != 'once' and advance_series(task, now):
+                print(f"⏰ Occurrence missed: {task.description}")
+                advanced.append(task)
+            else:
                 print(f"⏰ Task overdue: {task.description}")
                 task.status = 'Overdue'
-                task.fsm_state = 'Task Overdue'
+                reminder_engine.cancel(task.id)
+                missed.append(task)
+            stat_changes.append((task.user_id, before, task.stats_key()))
 
-                # Handle recurring tasks - create next instance even if overdue
-                if task.repeat != 'once':
-                    handle_recurring_task(task)
+        transitions = advance_fsm(missed, 'mark_overdue')
+        for event in ('mark_overdue', 'repeat_task', 'set_pending'):
+            transitions += advance_fsm(advanced, event)
+        db.session.commit()
 
-                db.session.commit()
+        transition_log.extend(transitions)
+        for user_id, before, after in stat_changes:
+            user_stats.record(user_id, before, after)
+        for task in advanced:
+            schedule_task_reminder(task)
 
 
 # Recurring task handler
-def handle_recurring_task(task):
-    """Creates next occurrence of recurring task"""
-    try:
-        last_time = datetime.strptime(task.remind_time, "%Y-%m-%d %H:%M")
-
-        if task.repeat == 'daily':
-            next_time = last_time + timedelta(days=1)
-        elif task.repeat == 'weekly':
-            next_time = last_time + timedelta(weeks=1)
-        elif task.repeat == 'monthly':
-            next_time = last_time + timedelta(days=30)
-        else:
+def advance_series(task, after):
+    """
+    Move a recurring task in place to its first occurrence after `after`. The series
+    stays a single row; only completions are stored, as TaskOccurrence exceptions.
+    Returns None, leaving the task as is, when its repeat kind is unknown (a one-off).
+    """
+    next_time = next_occurrence(task.series_start or task.remind_time, task.repeat, after)
+    if next_time is None:
+        return None
+    task.remind_time = next_time
+    task.reminder_at = compute_reminder_at(next_time, task.reminder_offset)
+    task.priority = calculate_priority(task.description, next_time, importance=task.importance)
+    print(f"🔄 Recurring task moved to next occurrence: {task.description} at {next_time}")
+    return next_time
+
+
+# Priority re-scoring - escalate tasks as their deadline crosses the 72h and 24h boundaries
+def rescore_priorities():
+    """
+    Re-score only the Pending tasks whose deadline crossed a priority boundary since
+    the last run. Each bucket is one (status, remind_time) index range and one bulk
+    UPDATE, so a run costs as much as the number of tasks that crossed. Every shard
+    is re-scored in parallel against its own last run.
+    """
+    shards.sweep(rescore_shard_priorities)
+
+
+def rescore_shard_priorities():
+    with app.app_context():
+        now = datetime.now()
+        last_run = get_scheduler_state(shards.state_key('priority_rescored_at'))
+        since = datetime.strptime(last_run, "%Y-%m-%d %H:%M:%S") if last_run else None
+        if since and since >= now:
             return
 
-        # Create new task for next occurrence
-        new_task = Task(
-            description=task.description,
-            remind_time=next_time.strftime("%Y-%m-%d %H:%M"),
-            reminder_offset=task.reminder_offset,
-            status='Pending',
-            priority=calculate_priority(task.description, next_time.strftime("%Y-%m-%d %H:%M")),
-            repeat=task.repeat,
-            alert_type=task.alert_type,
-            user_id=task.user_id,
-            fsm_state='Task Added'
-        )
-        db.session.add(new_task)
+        # (boundary, priority once inside it) - mirrors calculate_priority
+        buckets = [
+            (timedelta(hours=72), db.case((Task.importance >= HIGH_WEIGHT, 'High'), else_='Medium')),
+            (timedelta(hours=24), 'High'),
+        ]
+        changed = 0
+        changed_users = set()
+        for i, (boundary, priority) in enumerate(buckets):
+            crossed = [
+                Task.status == 'Pending',
+                Task.remind_time < now + boundary,
+                Task.priority != priority,
+            ]
+            if since:
+                crossed.append(Task.remind_time >= since + boundary)
+            if i + 1 < len(buckets):
+                # Tasks already past the next boundary are left to its bucket
+                crossed.append(Task.remind_time >= now + buckets[i + 1][0])
+
+            user_ids = db.session.execute(
+                db.update(Task).where(*crossed).values(priority=priority).returning(Task.user_id),
+                execution_options={'synchronize_session': False}
+            ).scalars().all()
+            changed += len(user_ids)
+            changed_users.update(user_ids)
+
+        set_scheduler_state(shards.state_key('priority_rescored_at'), now.strftime("%Y-%m-%d %H:%M:%S"))
+        db.session.commit()
 
-        # Archive current task (not mark as completed)
-        task.status = 'Archived'
-        task.fsm_state = 'Task Repeated'
+        for user_id in changed_users:
+            user_stats.invalidate(user_id)
+        if changed:
+            print(f"📈 Re-scored priority for {changed} tasks")
 
-        print(f"🔄 Recurring task created: {task.description} for {next_time}")
-    except Exception as e:
-        print(f"❌ Recurring task error: {e}")
+
+# Archival - move finished tasks out of the live table
+ARCHIVE_STATUSES = ('Completed', 'Archived')
+
+
+def archive_old_tasks():
+    """
+    Move Completed/Archived tasks untouched for ARCHIVE_AFTER_DAYS into the archive
+    database, one chunk per transaction, then release the freed pages incrementally.
+    Shards are archived in parallel; returns the number of tasks moved.
+    """
+    return sum(shards.sweep(archive_shard_tasks).values())
+
+
+def archive_shard_tasks():
+    with app.app_context():
+        now = datetime.now()
+        archivable = [
+            Task.status.in_(ARCHIVE_STATUSES),
+            Task.updated_at < now - timedelta(days=app.config['ARCHIVE_AFTER_DAYS']),
+        ]
+        moved = 0
+        while True:
+            ids = move_chunk(db.session, Task.__table__, db.engines['archive'], ArchivedTask.__table__,
+                             archivable, extra={'archived_at': now},
+                             children=[(TaskOccurrence.__table__, ArchivedTaskOccurrence.__table__)],
+                             chunk_size=app.config['ARCHIVE_CHUNK_SIZE'])
+            if not ids:
+                break
+            db.session.commit()
+            moved += len(ids)
+
+        if moved:
+            incremental_vacuum(shards.engine())
+            print(f"[Archive] Moved {moved} finished tasks to the archive")
+        return moved
 
 
 # Scheduler setup
 scheduler = BackgroundScheduler()
-scheduler.add_job(check_reminders, 'interval', minutes=1)
-scheduler.start()
 
-local_notified_tasks = set()
+
+def backfill_task_importance():
+    """Score keyword importance for tasks written before the column existed"""
+    automaton = priority_keywords.automaton()
+    rows = db.session.execute(db.select(Task.id, Task.description).where(Task.importance.is_(None))).all()
+    if not rows:
+        return
+    # updated_at is set to itself: a backfill is not a change (archival age, calendar validators)
+    task = Task.__table__
+    db.session.execute(
+        db.update(task).where(task.c.id == db.bindparam('task_id'))
+        .values(importance=db.bindparam('importance'), updated_at=task.c.updated_at),
+        [{'task_id': task_id, 'importance': keyword_importance(description, automaton)}
+         for task_id, description in rows]
+    )
+    db.session.commit()
+    print(f"[Schema] ✅ Scored keyword importance for {len(rows)} tasks")
+
+
+def init_db():
+    with app.app_context():
+        db.create_all()
+        upgrade_schema(db.engine, db.metadata)
+        for shard, engine in enumerate(shards.engines[1:], start=1):
+            db.metadata.create_all(engine, tables=SHARDED_TABLES)
+            upgrade_schema(engine, db.metadata)
+            seed_id_range(engine, Task.__table__, shard)
+        if shards.sharded:
+            # A new deployment spreads users over every shard; existing data stays put until split
+            with shards.use(0):
+                spread = db.session.execute(db.select(Task.id).limit(1)).first() is None
+            if seed_directory(shards, spread) and not spread:
+                print("[Shards] ⚠️ Every user is on shard 0; run `flask shards split 0 <shard>` to spread them")
+            shards.refresh()
+        for shard in range(len(shards)):
+            with shards.use(shard):
+                backfill_task_importance()
+        for engine in (*shards.engines, db.engines['archive']):
+            enable_incremental_vacuum(engine)
+
+
+def start_background_services():
+    """
+    Start the scheduler, reminder engine, outbox workers and password hashing pool.
+    Called explicitly by the entry point (app.run / wsgi.py) so importing the app
+    never spawns threads or processes.
+    Every process runs the reminder engine and polls the notification channel
+    for its own SSE streams, but the periodic jobs and the outbox only run in the
+    process holding the lease.
+    """
+    if scheduler.running:
+        return
+    scheduler_leader.heartbeat()
+    scheduler.add_job(scheduler_leader.heartbeat, 'interval', seconds=app.config['SCHEDULER_HEARTBEAT'])
+    scheduler.add_job(scheduler_leader.leader_only(check_reminders), 'interval', minutes=1)
+    scheduler.add_job(scheduler_leader.leader_only(rescore_priorities), 'interval', minutes=1)
+    scheduler.add_job(scheduler_leader.leader_only(compact_transition_log), 'interval', hours=6)
+    scheduler.add_job(scheduler_leader.leader_only(archive_old_tasks), 'interval', hours=1)
+    scheduler.add_job(scheduler_leader.leader_only(refresh_reminder_to_completion), 'interval', minutes=10,
+                      next_run_time=datetime.now())
+    scheduler.add_job(reconcile_user_stats, 'interval', minutes=10)  # Per-process cache
+    if shards.sharded:
+        # Picks up bucket moves even in a process serving no requests (per-process directory copy)
+        scheduler.add_job(shards.refresh, 'interval', seconds=app.config['SHARD_DIRECTORY_TTL'])
+    scheduler.start()
+    reminder_engine.start()
+    notification_broker.start()
+    outbox_workers.start()
+    transition_log.start()
+    password_hasher.start()
+    atexit.register(scheduler_leader.resign)
+    atexit.register(transition_log.stop)
+    atexit.register(notification_broker.stop)
+    atexit.register(password_hasher.stop)
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create and upgrade every database; run once per deploy, before the workers start"""
+    init_db()
+
+
+# Shard maintenance - `flask shards status|split|purge`, safe to run while the app serves requests
+@app.cli.group('shards')
+def shard_commands():
+    """Inspect and rebalance the per-user task shards"""
+
+
+@shard_commands.command('status')
+def shard_status():
+    init_db()
+    with app.app_context():
+        for shard, engine in enumerate(shards.engines):
+            with shards.use(shard):
+                tasks = db.session.execute(db.select(db.func.count(Task.id))).scalar()
+            print(f"shard {shard}: {tasks} tasks  {engine.url.render_as_string(hide_password=True)}")
+        print(shards.stats())
+
+
+@shard_commands.command('split')
+@click.argument('source', type=int)
+@click.argument('target', type=int)
+@click.option('--batch', default=8, help="Buckets moved per step (their users get 503s meanwhile)")
+@click.option('--drain', default=5.0, help="Seconds to wait after pausing a step's buckets")
+def shard_split(source, target, batch, drain):
+    """Move half of SOURCE's user buckets to TARGET"""
+    if not 0 <= target < len(shards) or not 0 <= source < len(shards):
+        raise click.BadParameter(f"Shards are numbered 0-{len(shards) - 1}; add the new one to SHARD_URLS first")
+    drain = max(drain, 2 * app.config['SHARD_DIRECTORY_TTL'])  # every process must see the pause first
+    init_db()
+    with app.app_context():
+        moved = split_shard(shards, source, target, users_in_buckets, Task.__table__, SHARDED_CHILDREN,
+                            batch=batch, drain=drain)
+    print(f"[Shards] ✅ Moved {moved} tasks from shard {source} to shard {target}")
+
+
+@shard_commands.command('purge')
+def shard_purge():
+    """Delete rows a shard holds for users it does not own (after an interrupted split)"""
+    init_db()
+    with app.app_context():
+        for shard in range(len(shards)):
+            purge_strays(shards, shard, users_in_buckets, Task.__table__, SHARDED_CHILDREN)
 
 
 # Routes - Authentication
@@ -233,7 +1156,10 @@ def signup():
             flash("Username already taken!", "danger")
             return redirect(url_for('signup'))
 
-        hashed_pw = generate_password_hash(password, method='pbkdf2:sha256')
+        try:
+            hashed_pw = password_hasher.hash(password)
+        except PasswordHasherBusy:
+            return hasher_busy('signup.html')
         user = User(username=username, email=email, password=hashed_pw)
         db.session.add(user)
         db.session.commit()
@@ -250,7 +1176,16 @@ def login():
         password = request.form['password']
         user = User.query.filter_by(email=email).first()
 
-        if user and check_password_hash(user.password, password):
+        try:
+            valid, new_hash = password_hasher.verify_and_update(user.password, password) if user else (False, None)
+        except PasswordHasherBusy:
+            return hasher_busy('login.html')
+
+        if valid:
+            if new_hash:
+                # Stored with an older iteration count; upgrade it while we have the password
+                user.password = new_hash
+                db.session.commit()
             login_user(user)
             flash(f"Welcome back, {user.username}!", "success")
             return redirect(url_for('index'))
@@ -283,26 +1218,35 @@ def add_task():
     offset = int(request.form['reminder_offset'])
     repeat = request.form.get('repeat', 'once')
     alert_type = request.form.get('alert_type', 'both')
-    remind_time = f"{date} {time}"
+    if repeat != 'once' and repeat not in REPEATS:
+        flash("Invalid repeat option!", "danger")
+        return redirect(url_for('view_tasks'))
 
     try:
-        datetime.strptime(remind_time, "%Y-%m-%d %H:%M")
+        remind_time = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
 
         # Calculate priority automatically
-        priority = calculate_priority(desc, remind_time)
+        importance = keyword_importance(desc)
+        priority = calculate_priority(desc, remind_time, importance=importance)
 
         new_task = Task(
             description=desc,
             remind_time=remind_time,
             reminder_offset=offset,
+            reminder_at=compute_reminder_at(remind_time, offset),
             priority=priority,
+            importance=importance,
             repeat=repeat,
+            series_start=remind_time if repeat != 'once' else None,
             alert_type=alert_type,
             user_id=current_user.id,
-            fsm_state='Task Added'
+            fsm_state='Pending'
         )
         db.session.add(new_task)
         db.session.commit()
+        transition_log.extend(creation_transitions(new_task.id, new_task.fsm_state))
+        user_stats.record(current_user.id, after=new_task.stats_key())
+        schedule_task_reminder(new_task)
         flash(f"Task added with {priority} priority!", "success")
     except ValueError:
         flash("Invalid date/time format!", "danger")
@@ -310,28 +1254,106 @@ def add_task():
     return redirect(url_for('view_tasks'))
 
 
+def parse_date_range(start, end):
+    """[start day, day after end) from the listing's YYYY-MM-DD inputs; None unless both are given"""
+    if not (start and end):
+        return None
+    return datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)
+
+
+def task_filters(user_id, q=None, date_range=None, priority=None, status=None, ranked=False):
+    """
+    WHERE conditions for the /tasks filters, shared by the listing and the bulk actions.
+
+    Returns:
+        (conditions, matches). With ranked=True and an FTS search, matches is the
+        (task_id, rank) subquery the caller must join to; otherwise the search is
+        part of the conditions and matches is None.
+    """
+    conditions = [Task.user_id == user_id]
+    matches = None
+    if q:
+        expression = match_expression(q, user_id) if fts_available(shards.engine()) else None
+        if expression:
+            matches = ranked_matches(expression)
+            if not ranked:
+                conditions.append(Task.id.in_(db.select(matches.c.task_id)))
+                matches = None
+        else:
+            conditions.append(Task.description.ilike(f"%{q}%"))
+    if date_range:
+        conditions += [Task.remind_time >= date_range[0], Task.remind_time < date_range[1]]
+    if priority:
+        conditions.append(Task.priority == priority)
+    if status:
+        conditions.append(Task.status == status)
+    return conditions, matches
+
+
+# Everything tasks.html reads from a row, plus the keyset sort columns
+TASK_LIST_COLUMNS = (Task.id, Task.description, Task.remind_time, Task.priority,
+                     Task.status, Task.repeat, Task.alert_type, Task.fsm_state)
+
+
 @app.route('/tasks')
 @login_required
 def view_tasks():
+    """
+    One page of the user's tasks, ordered by reminder time (or by rank when searching).
+
+    Query args:
+        q, start, end, priority, status: filters
+        cursor: next_cursor of the previous page
+        format: json for the infinite-scroll feed (tasks plus next_cursor)
+    """
     q = request.args.get('q', '')
     start = request.args.get('start')
     end = request.args.get('end')
     priority_filter = request.args.get('priority')
     status_filter = request.args.get('status')
+    as_json = request.args.get('format') == 'json'
 
-    query = Task.query.filter_by(user_id=current_user.id)
-
-    if q:
-        query = query.filter(Task.description.ilike(f"%{q}%"))
-    if start and end:
-        query = query.filter(Task.remind_time.between(start + " 00:00", end + " 23:59"))
-    if priority_filter:
-        query = query.filter_by(priority=priority_filter)
-    if status_filter:
-        query = query.filter_by(status=status_filter)
-
-    tasks = query.order_by(Task.remind_time).all()
-    return render_template('tasks.html', tasks=tasks)
+    try:
+        date_range = parse_date_range(start, end)
+    except ValueError:
+        flash("Invalid date range!", "danger")
+        date_range = None
+    conditions, matches = task_filters(current_user.id, q, date_range, priority_filter, status_filter, ranked=True)
+
+    # Only the columns the listing shows; rows are plain tuples, not Task instances
+    query = db.select(*TASK_LIST_COLUMNS).where(*conditions)
+    keys, key_types = [Task.remind_time, Task.id], (datetime.fromisoformat, int)
+    if matches is not None:
+        # Ranked prefix search on the FTS5 index, best matches first
+        query = query.add_columns(matches.c.rank).join(matches, matches.c.task_id == Task.id)
+        keys, key_types = [matches.c.rank, Task.id], (float, int)
+
+    after = None
+    if request.args.get('cursor'):
+        try:
+            after = decode_cursor(request.args['cursor'], key_types)
+        except ValueError as e:
+            if as_json:
+                return jsonify(error=str(e)), 400
+            flash("That page link has expired, showing the first page.", "warning")
+
+    with read_session() as session:
+        tasks, next_cursor = keyset_page(session, query, keys, after, app.config['TASKS_PAGE_SIZE'])
+    if as_json:
+        return jsonify(
+            tasks=[{
+                'id': task.id,
+                'description': task.description,
+                'remind_time': task.remind_time.strftime("%Y-%m-%d %H:%M"),
+                'priority': task.priority,
+                'status': task.status,
+                'repeat': task.repeat,
+                'alert_type': task.alert_type,
+                'fsm_state': task.fsm_state,
+            } for task in tasks],
+            next_cursor=next_cursor,
+        )
+    return render_template('tasks.html', tasks=tasks, next_cursor=next_cursor)
 
 
 @app.route('/delete/<int:id>')
@@ -342,9 +1364,14 @@ def delete_task(id):
         flash("Unauthorized action!", "danger")
         return redirect(url_for('view_tasks'))
 
+    before = task.stats_key()
+    from_state = task.fsm_state
     task.fsm_state = 'Task Deleted'
     db.session.delete(task)
     db.session.commit()
+    transition_log.record(id, from_state, 'delete_task', 'Task Deleted')
+    user_stats.record(current_user.id, before=before)
+    reminder_engine.cancel(id)
     flash("Task deleted.", "info")
     return redirect(url_for('view_tasks'))
 
@@ -358,17 +1385,40 @@ def edit_task(id):
         return redirect(url_for('view_tasks'))
 
     if request.method == 'POST':
+        try:
+            remind_time = datetime.strptime(f"{request.form['date']} {request.form['time']}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            flash("Invalid date/time format!", "danger")
+            return redirect(url_for('edit_task', id=id))
+        repeat = request.form.get('repeat', 'once')
+        if repeat != 'once' and repeat not in REPEATS:
+            flash("Invalid repeat option!", "danger")
+            return redirect(url_for('edit_task', id=id))
+
+        before = task.stats_key()
         task.description = request.form['description']
-        remind_time = f"{request.form['date']} {request.form['time']}"
         task.remind_time = remind_time
         task.reminder_offset = int(request.form['reminder_offset'])
-        task.repeat = request.form.get('repeat', 'once')
+        task.repeat = repeat
+        task.series_start = remind_time if task.repeat != 'once' else None  # re-anchor the series
         task.alert_type = request.form.get('alert_type', 'both')
+        task.reminder_at = compute_reminder_at(remind_time, task.reminder_offset)
+
+        # Rescheduled: priority is re-evaluated and the task waits for its (new) reminder again
+        transitions = []
+        if task.status == 'Pending':
+            transitions = advance_fsm([task], 'edit_task')
+            if transitions:
+                transitions += advance_fsm([task], 'set_pending')
 
         # Recalculate priority
-        task.priority = calculate_priority(task.description, remind_time)
+        task.importance = keyword_importance(task.description)
+        task.priority = calculate_priority(task.description, remind_time, importance=task.importance)
 
         db.session.commit()
+        transition_log.extend(transitions)
+        user_stats.record(current_user.id, before, task.stats_key())
+        schedule_task_reminder(task)
         flash("Task updated successfully!", "success")
         return redirect(url_for('view_tasks'))
 
@@ -383,172 +1433,527 @@ def complete_task(id):
         flash("Unauthorized action!", "danger")
         return redirect(url_for('view_tasks'))
 
+    before = task.stats_key()
+    if task.repeat in REPEATS and task.status == 'Pending':
+        # Complete this occurrence only and move the series on to the next one
+        db.session.add(TaskOccurrence(task_id=task.id, occurrence_time=task.remind_time, status='Completed'))
+        transitions = advance_fsm([task], 'complete_task')
+        next_time = advance_series(task, max(task.remind_time, datetime.now()))
+        for event in ('repeat_task', 'set_pending'):
+            transitions += advance_fsm([task], event)
+        db.session.commit()
+        transition_log.extend(transitions)
+        user_stats.record(current_user.id, before, task.stats_key())
+        schedule_task_reminder(task)
+        flash(f"Occurrence completed! Next one is on {next_time:%Y-%m-%d %H:%M}.", "success")
+        return redirect(url_for('view_tasks'))
+
+    from_state = task.fsm_state
     task.status = "Completed"
     task.fsm_state = "Task Completed"
     db.session.commit()
+    transition_log.record(id, from_state, 'complete_task', 'Task Completed')
+    user_stats.record(current_user.id, before, task.stats_key())
+    reminder_engine.cancel(id)
     flash("Task marked as completed!", "success")
     return redirect(url_for('view_tasks'))
 
 
-@app.route('/export')
+# Routes - Bulk actions (JSON body: {"ids": [...]} or {"filter": {q, start, end, priority, status}})
+def bulk_selection(payload):
+    """
+    Conditions for the current user's tasks a bulk request targets, and how many ids
+    it named (None for a filter). Raises ValueError with the message for a 400.
+    """
+    ids, filters = payload.get('ids'), payload.get('filter')
+    if (ids is None) == (filters is None):
+        raise ValueError("Send either ids or filter")
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(task_id, int) for task_id in ids):
+            raise ValueError("ids must be a list of task ids")
+        if len(ids) > BULK_MAX_IDS:
+            raise ValueError(f"At most {BULK_MAX_IDS} ids per request")
+        return [Task.user_id == current_user.id, Task.id.in_(ids)], len(set(ids))
+    if not isinstance(filters, dict):
+        raise ValueError("filter must be an object")
+    try:
+        date_range = parse_date_range(filters.get('start'), filters.get('end'))
+    except ValueError:
+        raise ValueError("start and end must be YYYY-MM-DD dates")
+    conditions, _ = task_filters(current_user.id, filters.get('q'), date_range,
+                                 filters.get('priority'), filters.get('status'))
+    return conditions, None
+
+
+def bulk_result(requested, **counts):
+    """Affected counts, plus how many named ids were missing, not the user's or not allowed by the FSM"""
+    if requested is not None:
+        counts['skipped'] = requested - sum(counts.values())
+    return jsonify(**counts)
+
+
+@app.route('/tasks/bulk/complete', methods=['POST'])
 @login_required
-def export_csv():
-    from flask import make_response
-    from io import StringIO
+def bulk_complete():
+    """
+    Complete many tasks in one transaction. One-off tasks are completed by set-based
+    UPDATEs; a Pending recurring series completes its current occurrence and moves
+    on to the next one, as /complete does.
+    """
+    try:
+        selection, requested = bulk_selection(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
 
-    tasks = Task.query.filter_by(user_id=current_user.id).all()
+    now = datetime.now()
+    series = Task.query.filter(*selection, Task.fsm_state.in_(fsm.sources('complete_task')),
+                               Task.repeat.in_(REPEATS), Task.status == 'Pending').all()
+    transitions = []
+    if series:
+        db.session.execute(db.insert(TaskOccurrence), [
+            {'task_id': task.id, 'occurrence_time': task.remind_time, 'status': 'Completed'} for task in series])
+        transitions += advance_fsm(series, 'complete_task')
+        for task in series:
+            advance_series(task, max(task.remind_time, now))
+        for event in ('repeat_task', 'set_pending'):
+            transitions += advance_fsm(series, event)
+
+    completed = bulk_transition(db.session, Task.__table__,
+                                [*selection, db.or_(Task.repeat.not_in(REPEATS), Task.status != 'Pending')],
+                                ('complete_task',), values={'status': 'Completed'})
+    db.session.commit()
 
-    # Create CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
-        ["ID", "Description", "Remind Time", "Priority", "Status", "Repeat", "Alert Type", "FSM State", "Created At"])
+    transition_log.extend(transitions + completed)
+    user_stats.invalidate(current_user.id)
+    for task in series:
+        schedule_task_reminder(task)
+    for task_id, _, _, _ in completed:
+        reminder_engine.cancel(task_id)
+    return bulk_result(requested, completed=len(completed), occurrences_completed=len(series))
 
-    for task in tasks:
-        writer.writerow([
-            task.id,
-            task.description,
-            task.remind_time,
-            task.priority,
-            task.status,
-            task.repeat,
-            task.alert_type,
-            task.fsm_state,
-            task.created_at or 'N/A'
-        ])
-
-    # Create response with CSV data
-    output.seek(0)
-    response = make_response(output.getvalue())
-    response.headers[
-        "Content-Disposition"] = f"attachment; filename=task_export_{current_user.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    response.headers["Content-Type"] = "text/csv"
+
+@app.route('/tasks/bulk/delete', methods=['POST'])
+@login_required
+def bulk_delete_tasks():
+    """Delete many tasks (and their completed occurrences) in one transaction"""
+    try:
+        selection, requested = bulk_selection(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    deleted = bulk_delete(db.session, Task.__table__, selection,
+                          children=[(TaskOccurrence.__table__, TaskOccurrence.task_id)])
+    db.session.commit()
+
+    transition_log.extend(deleted)
+    user_stats.invalidate(current_user.id)
+    for task_id, _, _, _ in deleted:
+        reminder_engine.cancel(task_id)
+    return bulk_result(requested, deleted=len(deleted))
+
+
+@app.route('/tasks/bulk/reschedule', methods=['POST'])
+@login_required
+def bulk_reschedule():
+    """
+    Move many Pending tasks to one new time ("remind_time": "YYYY-MM-DDTHH:MM") in a
+    single UPDATE. Reminder times, series anchors and priorities are recomputed in SQL.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        selection, requested = bulk_selection(payload)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    try:
+        remind_time = parse_calendar_bound(payload['remind_time'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error="remind_time must be an ISO 8601 date and time"), 400
+
+    now = datetime.now()
+    # Every row gets the same deadline, so each distinct offset/importance maps to one value
+    offsets = db.session.execute(db.select(Task.reminder_offset).where(*selection).distinct()).scalars().all()
+    reminder_at = {offset: compute_reminder_at(remind_time, offset) for offset in offsets if offset is not None}
+    rescheduled = bulk_transition(db.session, Task.__table__, selection, ('edit_task', 'set_pending'), values={
+        'remind_time': remind_time,
+        'reminder_at': db.case(reminder_at, value=Task.reminder_offset, else_=remind_time) if reminder_at
+                       else remind_time,
+        'series_start': db.case((Task.repeat != 'once', remind_time), else_=None),
+        'priority': db.case(
+            (Task.importance >= HIGH_WEIGHT, calculate_priority(None, remind_time, now, importance=HIGH_WEIGHT)),
+            (Task.importance >= MEDIUM_WEIGHT, calculate_priority(None, remind_time, now, importance=MEDIUM_WEIGHT)),
+            else_=calculate_priority(None, remind_time, now, importance=0)
+        ),
+    })
+    db.session.commit()
+
+    transition_log.extend(rescheduled)
+    user_stats.invalidate(current_user.id)
+    moved = [task_id for task_id, _, event, _ in rescheduled if event == 'set_pending']
+    for i in range(0, len(moved), 500):
+        reminder_engine.load((task_id, reminder_due_timestamp(due)) for task_id, due in db.session.execute(
+            db.select(Task.id, Task.reminder_at).where(Task.id.in_(moved[i:i + 500]))))
+    return bulk_result(requested, rescheduled=len(moved))
+
+
+@app.route('/export')
+@login_required
+def export_csv():
+    """
+    Stream the user's tasks as CSV (default), TSV or JSON Lines.
+
+    Query args:
+        format: csv, tsv or ndjson
+        columns: comma-separated subset of exporter.EXPORT_COLUMNS
+        gzip: 1 to compress the stream
+        archive: 1 to append the user's archived tasks after the live ones
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(error=f"Unsupported format: {fmt}"), 400
+    try:
+        columns = parse_columns(request.args.get('columns'))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    compress = request.args.get('gzip') == '1'
+
+    user_id = current_user.id
+    statements = [db.select(*[getattr(model, c) for c in columns])
+                  .where(model.user_id == user_id)
+                  .order_by(model.id)
+                  .execution_options(yield_per=EXPORT_BATCH_SIZE)
+                  for model in ((Task, ArchivedTask) if request.args.get('archive') == '1' else (Task,))]
+
+    shard = shards.current()
+
+    def generate():
+        # Rows are fetched in yield_per batches and written out as they arrive
+        with shards.use(shard), read_session() as session:
+            rows = (row for statement in statements for row in session.execute(statement))
+            chunks = export_chunks(rows, columns, fmt)
+            yield from gzip_chunks(chunks) if compress else (chunk.encode('utf-8') for chunk in chunks)
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"task_export_{current_user.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    if compress:
+        mimetype, filename = 'application/gzip', filename + '.gz'
 
     flash(f"CSV exported successfully!", "success")
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
     return response
 
 
+def insert_task_chunk(user_id, rows):
+    """Score, insert and commit one chunk of validated rows with a single executemany"""
+    now = datetime.now()
+    scored = calculate_priorities(((row['description'], row['remind_time']) for row in rows), now)
+    for row, (priority, importance) in zip(rows, scored):
+        row['priority'] = priority
+        row['importance'] = importance
+        row['series_start'] = row['remind_time'] if row['repeat'] != 'once' else None
+        row['reminder_at'] = compute_reminder_at(row['remind_time'], row['reminder_offset'])
+        row['user_id'] = user_id
+        row['created_at'] = row['created_at'] or now.replace(second=0, microsecond=0)
+
+    inserted = db.session.execute(
+        db.insert(Task).returning(Task.id, Task.reminder_at, Task.status, Task.fsm_state),
+        rows
+    ).all()
+    db.session.commit()
+
+    transition_log.extend(transition for task_id, _, _, fsm_state in inserted
+                          for transition in creation_transitions(task_id, fsm_state))
+    # Only upcoming reminders; the engine would fire every past one of a historical file at once
+    reminder_engine.load((task_id, reminder_due_timestamp(reminder_at))
+                         for task_id, reminder_at, status, fsm_state in inserted
+                         if status == 'Pending' and reminder_at >= now and fsm_state != 'Reminder Sent')
+    return len(inserted)
+
+
+@app.route('/import', methods=['POST'])
+@login_required
+def import_tasks():
+    """
+    Bulk-create tasks from an uploaded CSV (same columns as /export) or JSON Lines file.
+    Rows are parsed as a stream, validated one by one and inserted in chunked
+    transactions; invalid rows are skipped and reported with their line number.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    filename = upload.filename if upload else ''
+    fmt = request.args.get('format') or ('ndjson' if filename.endswith(('.jsonl', '.ndjson')) else 'csv')
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify(error=f"Unsupported format: {fmt}"), 400
+
+    user_id = current_user.id
+    started = time.perf_counter()
+    imported = failed = 0
+    errors = []
+    chunk = []
+
+    for line_number, record in iter_records(stream, fmt):
+        try:
+            chunk.append(validate_record(record))
+        except ValueError as e:
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"line": line_number, "error": str(e)})
+            continue
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            imported += insert_task_chunk(user_id, chunk)
+            chunk = []
+    if chunk:
+        imported += insert_task_chunk(user_id, chunk)
+
+    if imported:
+        user_stats.invalidate(user_id)
+    elapsed = time.perf_counter() - started
+    return jsonify(
+        imported=imported,
+        failed=failed,
+        errors=errors,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_sec=round(imported / elapsed) if elapsed else imported
+    ), 200 if imported or not failed else 400
+
+
 @app.route('/check-local-notifications')
 @login_required
 def check_local_notifications():
-    now = datetime.now()
+    minute_start = datetime.now().replace(second=0, microsecond=0)
     results = []
-    tasks = Task.query.filter_by(user_id=current_user.id, status='Pending').all()
+
+    # Tasks whose browser notification is due this minute (reminder time, not deadline)
+    tasks = Task.query.filter(
+        Task.user_id == current_user.id,
+        Task.status == 'Pending',
+        Task.reminder_at >= minute_start,
+        Task.reminder_at < minute_start + timedelta(minutes=1),
+        Task.alert_type.in_(['browser', 'both'])
+    ).all()
 
     for task in tasks:
-        if task.alert_type not in ['browser', 'both']:
-            continue
+        if delivery_claims.claim(delivery_key('browser', task)):
+            results.append(notification_payload(task))
 
-        task_time = datetime.strptime(task.remind_time, "%Y-%m-%d %H:%M")
-        reminder_time = task_time - timedelta(minutes=task.reminder_offset)
+    return jsonify(notifications=results)
 
-        # Check if it's time for browser notification (reminder time, not deadline)
-        if reminder_time.strftime("%Y-%m-%d %H:%M") == now.strftime("%Y-%m-%d %H:%M"):
-            if task.id not in local_notified_tasks:
-                results.append({
-                    "id": task.id,
-                    "description": task.description,
-                    "priority": task.priority,
-                    "minutes_before": task.reminder_offset
-                })
-                local_notified_tasks.add(task.id)
 
-    return jsonify(notifications=results)
+@app.route('/notifications/stream')
+@login_required
+def notification_stream():
+    """Server-Sent Events stream pushing browser reminders the moment the engine fires them"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    try:
+        subscription = notification_broker.subscribe(current_user.id, last_event_id)
+    except StreamLimitReached:
+        # EventSource gives up on a non-200 answer; the page then polls /check-local-notifications
+        return Response("retry: 60000\n\n", status=503, mimetype='text/event-stream', headers={'Retry-After': '60'})
+    heartbeat = app.config['SSE_HEARTBEAT']
+
+    def stream():
+        try:
+            yield f"retry: {app.config['SSE_RETRY_MS']}\n\n"
+            while True:
+                events = subscription.get(timeout=heartbeat)
+                if not events:
+                    yield ": heartbeat\n\n"
+                    continue
+                for event_id, data in events:
+                    yield f"id: {event_id}\nevent: reminder\ndata: {json.dumps(data)}\n\n"
+        finally:
+            notification_broker.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def refresh_reminder_to_completion():
+    """
+    Average Reminder Sent -> Task Completed time over the last week, across shards.
+    Scans a week of transition log on every shard, so the leader runs it on a
+    schedule and stores the result for every process's /metrics.
+    """
+    def shard_average():
+        with app.app_context():
+            return average_time_between(db.session, TaskTransition.__table__, 'Reminder Sent', 'Task Completed',
+                                        since=datetime.now() - timedelta(days=7))
+
+    averages = [average for average in shards.sweep(shard_average).values() if average['count']]
+    count = sum(average['count'] for average in averages)
+    average_seconds = round(sum(a['count'] * a['average_seconds'] for a in averages) / count, 1) if count else None
+    with app.app_context():
+        set_scheduler_state('completion_count', str(count))
+        set_scheduler_state('completion_average_seconds', '' if average_seconds is None else str(average_seconds))
+        set_scheduler_state('completion_computed_at', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        db.session.commit()
+
+
+def reminder_to_completion():
+    """The last stored refresh_reminder_to_completion() result"""
+    average_seconds = get_scheduler_state('completion_average_seconds')
+    return {
+        'count': int(get_scheduler_state('completion_count', '0')),
+        'average_seconds': float(average_seconds) if average_seconds else None,
+        'computed_at': get_scheduler_state('completion_computed_at'),
+    }
+
+
+def metrics_authorized():
+    """A scraper's METRICS_TOKEN bearer header, or a signed-in user when no token is configured"""
+    token = app.config['METRICS_TOKEN']
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    return current_user.is_authenticated
+
+
+@app.route('/metrics')
+def metrics():
+    if not metrics_authorized():
+        return jsonify(error="Unauthorized"), 401
+    return jsonify(reminder_engine=reminder_engine.stats(), user_stats=user_stats.stats(),
+                   notifications=notification_broker.stats(), transition_log=transition_log.stats(),
+                   password_hasher=password_hasher.stats(), session_users=session_users.stats(),
+                   shards=shards.stats(), reminder_to_completion=reminder_to_completion())
+
+
+@app.route('/tasks/<int:id>/history')
+@login_required
+def task_history(id):
+    """Replay a task's FSM transitions from its snapshot and the transition log"""
+    task = Task.query.get_or_404(id)
+    if task.user_id != current_user.id:
+        return jsonify(error="Unauthorized"), 403
+    transition_log.flush()  # include transitions still waiting in this process's buffer
+    return jsonify(replay(db.session, TaskTransition.__table__, TaskStateSnapshot.__table__, id))
 
 
 @app.route('/calendar')
 @login_required
 def calendar():
-    tasks = Task.query.filter_by(user_id=current_user.id).all()
-    events = []
-    for task in tasks:
-        # Color coding based on status and priority
-        if task.status == "Completed":
-            color = "#6c757d"  # Gray
-        elif task.status == "Overdue":
-            color = "#8b0000"  # Dark red
-        elif task.priority == "High":
-            color = "#dc3545"  # Red
-        elif task.priority == "Medium":
-            color = "#ffc107"  # Yellow
-        else:
-            color = "#28a745"  # Green
+    # Events are fetched per visible range from /calendar/events
+    return render_template("calendar.html")
+
+
+def calendar_event(task, start, virtual=False, status=None):
+    status = status or task.status
+
+    # Color coding based on status and priority
+    if status == "Completed":
+        color = "#6c757d"  # Gray
+    elif status == "Overdue":
+        color = "#8b0000"  # Dark red
+    elif task.priority == "High":
+        color = "#dc3545"  # Red
+    elif task.priority == "Medium":
+        color = "#ffc107"  # Yellow
+    else:
+        color = "#28a745"  # Green
+
+    return {
+        "title": f"[{task.priority}] {task.description}",
+        "start": start.strftime("%Y-%m-%dT%H:%M"),
+        "color": color,
+        "extendedProps": {
+            "status": status,
+            "priority": task.priority,
+            "virtual": virtual
+        }
+    }
 
-        events.append({
-            "title": f"[{task.priority}] {task.description}",
-            "start": task.remind_time.replace(" ", "T"),
-            "color": color,
-            "extendedProps": {
-                "status": task.status,
-                "priority": task.priority
-            }
-        })
-    return render_template("calendar.html", events=events)
+
+def parse_calendar_bound(value):
+    """FullCalendar sends ISO 8601 range bounds, possibly with a UTC offset"""
+    bound = datetime.fromisoformat(value)
+    if bound.tzinfo is not None:
+        bound = bound.astimezone().replace(tzinfo=None)
+    return bound
+
+
+@app.route('/calendar/events')
+@login_required
+def calendar_events():
+    """
+    Events inside FullCalendar's visible [start, end) window. Recurring series are
+    expanded from their rule inside the window, with completed occurrences taken
+    from the TaskOccurrence exception rows. Responses carry an ETag and
+    Last-Modified so navigating back to a range is a cheap 304.
+    """
+    try:
+        start = parse_calendar_bound(request.args['start'])
+        end = parse_calendar_bound(request.args['end'])
+    except (KeyError, ValueError):
+        return jsonify(error="start and end must be ISO 8601 dates"), 400
+
+    in_window = db.and_(Task.user_id == current_user.id, Task.remind_time >= start, Task.remind_time < end)
+    recurring = db.and_(Task.user_id == current_user.id, Task.status == 'Pending',
+                        Task.repeat != 'once', db.func.coalesce(Task.series_start, Task.remind_time) < end)
+
+    with read_session() as session:
+        # Cheap validators first: only scalars, answered from the indexes
+        validators = [session.execute(
+            db.select(db.func.count(), db.func.max(Task.updated_at)).where(condition)
+        ).one() for condition in (in_window, recurring)]
+        last_modified = max((changed for _, changed in validators if changed), default=None)
+        if last_modified:
+            last_modified = last_modified.replace(microsecond=0).astimezone(timezone.utc)  # Stored as local time
+        etag = f"{current_user.id}-{start:%Y%m%d%H%M}-{end:%Y%m%d%H%M}-" + "-".join(
+            f"{count}.{changed.timestamp() if changed else 0:.0f}" for count, changed in validators)
+
+        if request.if_none_match.contains(etag) or (
+                not request.if_none_match and last_modified and request.if_modified_since
+                and last_modified <= request.if_modified_since):
+            response = app.response_class(status=304)
+        else:
+            events = [calendar_event(task, task.remind_time)
+                      for task in session.scalars(db.select(Task).where(in_window).order_by(Task.remind_time))]
+            series = session.scalars(db.select(Task).where(recurring)).all()
+            completed = set(session.execute(
+                db.select(TaskOccurrence.task_id, TaskOccurrence.occurrence_time).where(
+                    TaskOccurrence.task_id.in_([task.id for task in series]),
+                    TaskOccurrence.occurrence_time >= start, TaskOccurrence.occurrence_time < end)
+            ).all()) if series else set()
+            for task in series:
+                for occurrence in occurrences_between(task.series_start or task.remind_time, task.repeat, start, end):
+                    if occurrence == task.remind_time:
+                        continue  # the series row itself, already listed above
+                    if (task.id, occurrence) in completed:
+                        status = 'Completed'
+                    else:
+                        status = 'Overdue' if occurrence < task.remind_time else 'Pending'
+                    events.append(calendar_event(task, occurrence, virtual=True, status=status))
+            response = jsonify(events)
+
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    from collections import defaultdict
-
-    tasks = Task.query.filter_by(user_id=current_user.id).all()
-    total_tasks = len(tasks)
-    pending_tasks = len([t for t in tasks if t.status == 'Pending'])
-    completed_tasks = len([t for t in tasks if t.status == 'Completed'])
-    overdue_tasks = len([t for t in tasks if t.status == 'Overdue'])
-    high_priority = len([t for t in tasks if t.priority == 'High' and t.status == 'Pending'])
-    recurring_tasks = len([t for t in tasks if t.repeat != 'once'])
-
-    upcoming = Task.query.filter_by(user_id=current_user.id, status='Pending').order_by(Task.remind_time).limit(5).all()
-
-    # Tasks per day (last 7 days)
-    task_dates = defaultdict(int)
-    today = datetime.now().date()
-    for i in range(7):
-        day = today - timedelta(days=i)
-        count = Task.query.filter(
-            Task.user_id == current_user.id,
-            Task.remind_time.like(f"{day}%")
-        ).count()
-        task_dates[day.strftime("%Y-%m-%d")] = count
-
-    chart_labels = list(task_dates.keys())[::-1]
-    chart_data = list(task_dates.values())[::-1]
-
-    # Priority distribution
-    priority_data = {
-        'High': len([t for t in tasks if t.priority == 'High']),
-        'Medium': len([t for t in tasks if t.priority == 'Medium']),
-        'Low': len([t for t in tasks if t.priority == 'Low'])
-    }
+    stats = user_stats.get(current_user.id)
 
-    # Status distribution (including overdue)
-    status_data = {
-        'Pending': pending_tasks,
-        'Completed': completed_tasks,
-        'Overdue': overdue_tasks
-    }
+    with read_session() as session:
+        upcoming = session.execute(
+            db.select(Task.description, Task.remind_time, Task.priority, Task.repeat)
+            .where(Task.user_id == current_user.id, Task.status == 'Pending')
+            .order_by(Task.remind_time)
+            .limit(5)
+        ).all()
 
-    # Calculate completion rate (only from completed and overdue, not archived)
-    actionable_tasks = completed_tasks + overdue_tasks
-    completion_rate = round((completed_tasks / actionable_tasks * 100) if actionable_tasks > 0 else 0, 1)
-
-    return render_template("dashboard.html",
-                           total=total_tasks,
-                           pending=pending_tasks,
-                           completed=completed_tasks,
-                           overdue=overdue_tasks,
-                           high_priority=high_priority,
-                           recurring=recurring_tasks,
-                           upcoming=upcoming,
-                           labels=chart_labels,
-                           chart_data=chart_data,
-                           priority_data=priority_data,
-                           status_data=status_data,
-                           completion_rate=completion_rate)
+    return render_template("dashboard.html", upcoming=upcoming, **stats)
 
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+    init_db()
+    # The debug reloader runs this script twice; only the serving child starts services
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,79 @@
+# archive.py - Cold storage for finished tasks
+#
+# Terminal-state tasks are moved, a chunk per transaction, from the live task table
+# into an identical table in a separate archive database, together with their child
+# rows (completed occurrences). Live queries never see them; exports and reporting
+# read the archive only when asked to.
+
+from sqlalchemy import delete, select, text
+
+
+def move_chunk(session, live, archive_engine, archive, where, extra=None, children=(), chunk_size=500):
+    """
+    Copy one chunk of matching live rows into the archive and delete them from the live table.
+
+    The archive transaction commits first and replaces any copy left by an earlier
+    interrupted run, so a crash between the two commits never loses a row.
+
+    Args:
+        session: live database session (committed here)
+        live / archive: the live and archive Table objects (same columns)
+        where: list of conditions selecting archivable live rows
+        extra: values added to every archived row (e.g. archived_at)
+        children: (live table, archive table) pairs of rows keyed by task_id that move with their task
+
+    Returns:
+        list of ids moved (empty when nothing is left to archive)
+    """
+    rows = session.execute(
+        select(live).where(*where).order_by(live.c.id).limit(chunk_size)
+    ).mappings().all()
+    if not rows:
+        return []
+
+    ids = [row['id'] for row in rows]
+    child_rows = [
+        session.execute(select(live_child).where(live_child.c.task_id.in_(ids))).mappings().all()
+        for live_child, _ in children
+    ]
+    with archive_engine.begin() as conn:
+        for (_, archive_child), moved in zip(children, child_rows):
+            conn.execute(delete(archive_child).where(archive_child.c.task_id.in_(ids)))
+            if moved:
+                conn.execute(archive_child.insert(), [dict(row) for row in moved])
+        conn.execute(delete(archive).where(archive.c.id.in_(ids)))
+        conn.execute(archive.insert(), [{**row, **(extra or {})} for row in rows])
+    for live_child, _ in children:
+        session.execute(delete(live_child).where(live_child.c.task_id.in_(ids)))
+    session.execute(delete(live).where(live.c.id.in_(ids)))
+    return ids
+
+
+def enable_incremental_vacuum(engine):
+    """
+    Switch a SQLite database to auto_vacuum=INCREMENTAL so pages freed by archiving can
+    be returned to the OS a few at a time. Changing the mode needs one full VACUUM.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+            return
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        conn.execute(text("VACUUM"))
+    print(f"[Archive] ✅ Enabled incremental vacuum on {engine.url.database}")
+
+
+def incremental_vacuum(engine, pages=2000):
+    """Release up to `pages` free pages; returns how many were free before"""
+    if engine.dialect.name != 'sqlite':
+        return 0
+    raw = engine.raw_connection()
+    try:
+        free = raw.cursor().execute("PRAGMA freelist_count").fetchone()[0]
+        if free:
+            # sqlite3's execute() steps the pragma once (one page); executescript runs it to completion
+            raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+    finally:
+        raw.close()
+    return free
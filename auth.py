@@ -1,15 +1,27 @@
-from flask import Blueprint, render_template, redirect, request, url_for, flash
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, current_app, render_template, redirect, request, url_for, flash
 from flask_login import login_user, logout_user, login_required
 from models import db, User
+from hashing import PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
+def busy(template):
+    flash("Too many sign-ins right now, please try again in a moment.", "warning")
+    return render_template(template), 429, {'Retry-After': '2'}
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         user = User.query.filter_by(email=request.form['email']).first()
-        if user and check_password_hash(user.password, request.form['password']):
+        hasher = current_app.extensions['password_hasher']
+        try:
+            valid, new_hash = hasher.verify_and_update(user.password, request.form['password']) if user else (False, None)
+        except PasswordHasherBusy:
+            return busy('login.html')
+        if valid:
+            if new_hash:
+                user.password = new_hash
+                db.session.commit()
             login_user(user)
             flash("Welcome back!", "success")
             return redirect(url_for('home'))
@@ -19,7 +31,10 @@ def login():
 @auth_bp.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST':
-        hashed_pw = generate_password_hash(request.form['password'])
+        try:
+            hashed_pw = current_app.extensions['password_hasher'].hash(request.form['password'])
+        except PasswordHasherBusy:
+            return busy('signup.html')
         user = User(username=request.form['username'], email=request.form['email'], password=hashed_pw)
         db.session.add(user)
         db.session.commit()
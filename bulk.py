@@ -0,0 +1,174 @@
+# bulk.py - Set-based FSM transitions over many tasks at once
+#
+# A bulk action is a handful of UPDATE/DELETE statements whose WHERE clause carries
+# the ownership check, the caller's selection and the FSM guard (fsm_state IN the
+# states that allow the event), instead of a load/check/commit round trip per task.
+# Rows the FSM does not allow to move are simply not matched.
+
+from sqlalchemy import delete, select, update
+
+import fsm
+
+
+def event_paths(events):
+    """
+    For events applied one after another, map every state that allows the whole
+    sequence to the states it passes through.
+
+    Returns:
+        {from_state: [state after events[0], state after events[1], ...]}
+    """
+    paths = {}
+    for start in fsm.sources(events[0]):
+        state, path = start, []
+        for event in events:
+            state = fsm.apply([state], event)[0]
+            if state is None:
+                break
+            path.append(state)
+        else:
+            paths[start] = path
+    return paths
+
+
+def bulk_transition(session, task, where, events, values=None):
+    """
+    Apply a sequence of FSM events to every task row matching `where`.
+
+    One UPDATE runs per starting state (a few at most), each guarded by
+    `fsm_state = <that state>`, so the transitions logged are exact. No path may end
+    in a different starting state of the same sequence (checked below), so a row
+    is never moved twice.
+
+    Args:
+        task: the task Table
+        where: conditions selecting the rows (ownership, ids or filters)
+        events: event names, e.g. ('complete_task',) or ('edit_task', 'set_pending')
+        values: extra column values set on every moved row
+
+    Returns:
+        (task_id, from_state, event, to_state) tuples for transition_log
+    """
+    paths = event_paths(events)
+    if any(path[-1] != start and path[-1] in paths for start, path in paths.items()):
+        raise ValueError(f"FSM events {events} can move a task into another of their start states")
+
+    transitions = []
+    for from_state, path in paths.items():
+        moved = session.execute(
+            update(task)
+            .where(*where, task.c.fsm_state == from_state)
+            .values(fsm_state=path[-1], **(values or {}))
+            .returning(task.c.id),
+            execution_options={'synchronize_session': False}
+        ).scalars().all()
+        for task_id in moved:
+            state = from_state
+            for event, new_state in zip(events, path):
+                transitions.append((task_id, state, event, new_state))
+                state = new_state
+    return transitions
+
+
+def bulk_delete(session, task, where, children=()):
+    """
+    Delete every task row matching `where` whose state allows delete_task.
+
+    Args:
+        children: (table, task_id column) pairs whose rows go with their task
+
+    Returns:
+        (task_id, from_state, 'delete_task', 'Task Deleted') tuples for transition_log
+    """
+    condition = [*where, task.c.fsm_state.in_(fsm.sources('delete_task'))]
+    for child, task_id in children:
+        session.execute(
+            delete(child).where(task_id.in_(select(task.c.id).where(*condition))),
+            execution_options={'synchronize_session': False}
+        )
+    deleted = session.execute(
+        delete(task).where(*condition).returning(task.c.id, task.c.fsm_state),
+        execution_options={'synchronize_session': False}
+    ).all()
+    return [(task_id, from_state, 'delete_task', fsm.apply([from_state], 'delete_task')[0])
+            for task_id, from_state in deleted]
+
+
+# Throughput check: per-task load/check/commit (the GET routes) vs one set-based batch
+if __name__ == "__main__":
+    import tempfile
+    import time
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import (Column, DateTime, ForeignKey, Integer, MetaData, String, Table,
+                            create_engine, insert)
+    from sqlalchemy.orm import Session
+
+    metadata = MetaData()
+    task = Table(
+        'task', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('description', String(200)),
+        Column('user_id', Integer, index=True),
+        Column('remind_time', DateTime),
+        Column('status', String(20)),
+        Column('fsm_state', String(50)),
+    )
+    occurrence = Table(
+        'task_occurrence', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('task_id', Integer, ForeignKey('task.id'), index=True),
+    )
+
+    def seed(count):
+        engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/bulk.db")
+        metadata.create_all(engine)
+        base = datetime(2025, 1, 1)
+        states = ['Pending', 'Reminder Sent', 'Task Overdue', 'Task Completed']
+        with engine.begin() as conn:
+            conn.execute(insert(task), [{'description': f"Task {i}", 'user_id': 1 + i % 2,
+                                         'remind_time': base + timedelta(minutes=i), 'status': 'Pending',
+                                         'fsm_state': states[i % len(states)]} for i in range(count * 2)])
+        ids = list(range(1, count * 2 + 1, 2))  # user 1's tasks
+        return engine, ids
+
+    def one_by_one(engine, ids, event):
+        # What the /complete and /delete links cost: one lookup, check and commit per task
+        with Session(engine) as session:
+            for task_id in ids:
+                row = session.execute(select(task).where(task.c.id == task_id)).first()
+                if row is None or row.user_id != 1:
+                    continue
+                new_state = fsm.apply([row.fsm_state], event)[0]
+                if new_state is None:
+                    continue
+                if event == 'delete_task':
+                    session.execute(delete(occurrence).where(occurrence.c.task_id == task_id))
+                    session.execute(delete(task).where(task.c.id == task_id))
+                else:
+                    session.execute(update(task).where(task.c.id == task_id)
+                                    .values(status='Completed', fsm_state=new_state))
+                session.commit()
+
+    def set_based(engine, ids, event):
+        with Session(engine) as session:
+            where = [task.c.user_id == 1, task.c.id.in_(ids)]
+            if event == 'delete_task':
+                bulk_delete(session, task, where, children=[(occurrence, occurrence.c.task_id)])
+            else:
+                bulk_transition(session, task, where, (event,), values={'status': 'Completed'})
+            session.commit()
+
+    print("=" * 60)
+    print("Bulk task actions: one-by-one vs set-based (tasks/second)")
+    print("=" * 60)
+    for count in (100, 1000, 5000):
+        for event in ('complete_task', 'delete_task'):
+            rates = []
+            for action in (one_by_one, set_based):
+                engine, ids = seed(count)
+                start = time.perf_counter()
+                action(engine, ids, event)
+                rates.append(count / (time.perf_counter() - start))
+                engine.dispose()
+            print(f"{count:>5} tasks {event:<14} one-by-one {rates[0]:9.0f}/s   set-based {rates[1]:10.0f}/s")
@@ -0,0 +1,70 @@
+# cache.py - Small thread-safe LRU cache with per-entry time-to-live
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire `ttl` seconds after they were stored.
+
+    Args:
+        maxsize: entries kept before the least recently used one is evicted
+        ttl: seconds an entry stays valid (None = never expires)
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl is not None and entry[1] < time.monotonic()):
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key, default=None):
+        """Return a live entry without touching LRU order or hit/miss counters"""
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl is not None and entry[1] < time.monotonic()):
+                return default
+            return entry[0]
+
+    def set(self, key, value):
+        with self.lock:
+            expires = time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self._data.clear()
+
+    def keys(self):
+        with self.lock:
+            return list(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,186 @@
+# db_profile.py - Engine settings for SQLite in production, or PostgreSQL via DATABASE_URL
+#
+# SQLite runs in WAL mode so readers never block the writer (or each other), with a
+# busy timeout so a writer waits for the lock instead of raising "database is locked".
+# Read-heavy routes use a separate pool of read-only connections; every write still
+# goes through the primary engine of its database.
+
+import os
+
+from sqlalchemy import create_engine, event, make_url
+
+
+def database_uri(url):
+    """DATABASE_URL as SQLAlchemy expects it (Heroku-style postgres:// is not accepted)"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_file_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(uri, pool_size=5):
+    """SQLALCHEMY_ENGINE_OPTIONS for the primary engine"""
+    if uri.startswith('sqlite'):
+        return {}
+    return {'pool_size': pool_size, 'pool_pre_ping': True}
+
+
+def configure_engine(engine, busy_timeout=5000, cache_size_kb=65536, mmap_size=268435456, read_only=False):
+    """
+    Apply the connection pragmas to every new SQLite connection of `engine`
+    (no-op for other databases and in-memory SQLite).
+
+    Args:
+        busy_timeout: milliseconds to wait for a lock before failing
+        cache_size_kb: page cache per connection
+        mmap_size: bytes of the file read through memory mapping
+        read_only: refuse writes on these connections (PRAGMA query_only)
+    """
+    if not is_file_sqlite(engine.url):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode = WAL")  # Persistent; readers only need it set once
+        cursor.execute("PRAGMA synchronous = NORMAL")  # Durable at checkpoints, safe against corruption in WAL
+        cursor.execute(f"PRAGMA cache_size = {-int(cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+def create_shard_engine(url, root=None, pool_size=5, **pragmas):
+    """
+    Primary engine for another database holding part of the data (a shard), with
+    the same settings as the app's own. A relative SQLite path is resolved against
+    `root` (the instance folder), as Flask-SQLAlchemy does for the main database.
+    """
+    url = make_url(database_uri(url))
+    if root and is_file_sqlite(url) and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(root, url.database))
+    engine = create_engine(url, **engine_options(url.drivername, pool_size))
+    configure_engine(engine, **pragmas)
+    return engine
+
+
+def create_read_engine(engine, url=None, pool_size=8, **pragmas):
+    """
+    Engine for read-only queries: `url` (e.g. a PostgreSQL replica) or the primary
+    database through its own pool. In-memory SQLite cannot be shared, so the primary
+    engine is returned as is.
+    """
+    if url:
+        read_engine = create_engine(database_uri(url), pool_size=pool_size, pool_pre_ping=True)
+    elif is_file_sqlite(engine.url):
+        read_engine = create_engine(engine.url, pool_size=pool_size, max_overflow=pool_size)
+    elif engine.url.get_backend_name() == 'sqlite':
+        return engine
+    else:
+        read_engine = create_engine(engine.url, pool_size=pool_size, pool_pre_ping=True,
+                                    execution_options={'postgresql_readonly': True})
+    configure_engine(read_engine, read_only=True, **pragmas)
+    return read_engine
+
+
+# Concurrency check: mixed readers and writers on one SQLite file, default settings vs this profile
+if __name__ == "__main__":
+    import random
+    import statistics
+    import tempfile
+    import threading
+    import time
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, func,
+                            insert, select, update)
+    from sqlalchemy.exc import OperationalError
+
+    metadata = MetaData()
+    task = Table(
+        'task', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('description', String(200)),
+        Column('user_id', Integer),
+        Column('remind_time', DateTime),
+        Column('status', String(20)),
+        Index('ix_task_user_remind_time', 'user_id', 'remind_time'),
+    )
+
+    def run(profile, readers=8, writers=2, seconds=5):
+        path = f"{tempfile.mkdtemp()}/profile.db"
+        if profile:
+            engine = create_engine(f"sqlite:///{path}")
+            configure_engine(engine)
+            read_engine = create_read_engine(engine)
+        else:
+            # The previous setup: rollback journal, pysqlite's default 5 s lock wait, one pool
+            engine = read_engine = create_engine(f"sqlite:///{path}")
+        metadata.create_all(engine)
+        base = datetime(2025, 1, 1)
+        with engine.begin() as conn:
+            conn.execute(insert(task), [{'description': f"Task {i}", 'user_id': i % 100,
+                                         'remind_time': base + timedelta(minutes=i), 'status': 'Pending'}
+                                        for i in range(50000)])
+
+        stop = time.monotonic() + seconds
+        read_ms, write_ms, errors = [], [], []
+
+        def reader():
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    with read_engine.connect() as conn:
+                        # A /tasks page plus a dashboard-style aggregate
+                        user_id = random.randrange(100)
+                        conn.execute(select(task).where(task.c.user_id == user_id)
+                                     .order_by(task.c.remind_time).limit(50)).all()
+                        conn.execute(select(task.c.status, func.count()).where(task.c.user_id == user_id)
+                                     .group_by(task.c.status)).all()
+                    read_ms.append((time.perf_counter() - start) * 1000)
+                except OperationalError as e:
+                    errors.append(str(e.orig))
+
+        def writer():
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(task), [{'description': "new", 'user_id': random.randrange(100),
+                                                     'remind_time': base, 'status': 'Pending'}])
+                        conn.execute(update(task).where(task.c.id == random.randrange(1, 50000))
+                                     .values(status='Completed'))
+                    write_ms.append((time.perf_counter() - start) * 1000)
+                except OperationalError as e:
+                    errors.append(str(e.orig))
+                time.sleep(0.002)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        read_engine.dispose()
+
+        def p99(values):
+            return sorted(values)[int(len(values) * 0.99)] if values else 0.0
+        return (len(read_ms), statistics.median(read_ms or [0]), p99(read_ms),
+                len(write_ms), statistics.median(write_ms or [0]), p99(write_ms), len(errors))
+
+    print("=" * 60)
+    print("Mixed load on one SQLite file, 8 reader + 2 writer threads, 5 s")
+    print("=" * 60)
+    random.seed(7)
+    for name, profile in (("default", False), ("WAL profile", True)):
+        reads, r50, r99, writes, w50, w99, errors = run(profile)
+        print(f"{name:<12} reads {reads:>6} (p50 {r50:5.2f} p99 {r99:6.2f} ms)"
+              f"   writes {writes:>5} (p50 {w50:5.2f} p99 {w99:6.2f} ms)   errors {errors}")
@@ -0,0 +1,152 @@
+# dedupe.py - "Deliver at most once" claim stores for reminders and notifications
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryDedupeStore:
+    """
+    In-process claim store with TTL expiry and a hard size cap.
+
+    All keys share one TTL, so insertion order is also expiry order and expired
+    keys are purged from the front of the OrderedDict in amortized O(1).
+    """
+
+    def __init__(self, ttl=86400, max_size=100_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """Return True exactly once per key within the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            while self._keys:
+                oldest, expires = next(iter(self._keys.items()))
+                if expires > now:
+                    break
+                del self._keys[oldest]
+
+            if key in self._keys:
+                return False
+            self._keys[key] = now + self.ttl
+            if len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+            return True
+
+    def release(self, key):
+        """Forget a claim whose delivery did not happen, so it can be claimed again"""
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class SQLiteDedupeStore:
+    """
+    Claim store in a small SQLite file shared by every worker process on the host.
+
+    A claim is a single INSERT OR IGNORE on the primary key, so exactly one
+    process wins even when several fire the same reminder at the same moment.
+    """
+
+    def __init__(self, path, ttl=86400, purge_interval=60):
+        self.path = path
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS dedupe_claim (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_dedupe_claim_expires_at ON dedupe_claim (expires_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def claim(self, key):
+        """Return True exactly once per key within the TTL, across all processes"""
+        now = time.time()
+        conn = self._connection()
+        if now - self._last_purge > self.purge_interval:
+            self._last_purge = now
+            conn.execute("DELETE FROM dedupe_claim WHERE expires_at <= ?", (now,))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM dedupe_claim WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO dedupe_claim (key, expires_at) VALUES (?, ?)",
+                                  (key, now + self.ttl))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def release(self, key):
+        """Forget a claim whose delivery did not happen, so it can be claimed again"""
+        self._connection().execute("DELETE FROM dedupe_claim WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM dedupe_claim").fetchone()[0]
+
+
+def make_dedupe_store(url, ttl=86400, max_size=100_000):
+    """
+    Build a store from a config string:
+        'memory'                 - per-process MemoryDedupeStore
+        'sqlite:///path/to/file' - SQLiteDedupeStore shared between processes
+    """
+    if url == 'memory':
+        return MemoryDedupeStore(ttl=ttl, max_size=max_size)
+    if url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SQLiteDedupeStore(path, ttl=ttl)
+    raise ValueError(f"Unsupported dedupe store: {url}")
+
+
+# Memory growth check: millions of simulated notifications against a bounded store
+if __name__ == "__main__":
+    import tempfile
+    import tracemalloc
+
+    print("=" * 60)
+    print("Dedupe store memory growth")
+    print("=" * 60)
+
+    store = MemoryDedupeStore(ttl=3600, max_size=100_000)
+    tracemalloc.start()
+    for i in range(1, 3_000_001):
+        store.claim(f"browser:{i}:2025-01-01T09:00")
+        if i % 500_000 == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"{i:>9,} claims  keys={len(store):>7,}  current={current / 1e6:6.1f} MB  peak={peak / 1e6:6.1f} MB")
+    tracemalloc.stop()
+
+    unbounded = set()
+    tracemalloc.start()
+    for i in range(1, 1_000_001):
+        unbounded.add(f"browser:{i}:2025-01-01T09:00")
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Old global set after 1,000,000 notifications: {current / 1e6:6.1f} MB and still growing")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = make_dedupe_store(f"sqlite:///{os.path.join(tmp, 'dedupe.db')}")
+        other = make_dedupe_store(f"sqlite:///{os.path.join(tmp, 'dedupe.db')}")
+        start = time.perf_counter()
+        wins = sum(shared.claim(f"k{i}") + other.claim(f"k{i}") for i in range(5_000))
+        elapsed = time.perf_counter() - start
+        print(f"SQLite store: {wins} wins for 5,000 keys claimed twice ({10_000 / elapsed:,.0f} claims/s)")
@@ -0,0 +1,102 @@
+# exporter.py - Generator pipeline that turns task rows into CSV/TSV/JSON Lines chunks
+
+import csv
+import json
+import zlib
+
+# Column name -> header used in CSV exports (same order and labels as the original export)
+EXPORT_COLUMNS = {
+    'id': "ID",
+    'description': "Description",
+    'remind_time': "Remind Time",
+    'priority': "Priority",
+    'status': "Status",
+    'repeat': "Repeat",
+    'alert_type': "Alert Type",
+    'fsm_state': "FSM State",
+    'created_at': "Created At",
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'tsv': ('text/tab-separated-values', 'tsv'),
+    'ndjson': ('application/x-ndjson', 'jsonl'),
+}
+
+
+def parse_columns(value):
+    """Validate a comma-separated ?columns= value; empty means every column"""
+    if not value:
+        return list(EXPORT_COLUMNS)
+    columns = [c.strip() for c in value.split(',') if c.strip()]
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return columns
+
+
+def _cell(value):
+    if value is None:
+        return 'N/A'
+    if hasattr(value, 'strftime'):
+        return value.strftime("%Y-%m-%d %H:%M")
+    return value
+
+
+class _LineBuffer:
+    """Minimal file object for csv.writer that hands back what was written"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def drain(self):
+        text = ''.join(self.parts)
+        self.parts = []
+        return text
+
+
+def delimited_chunks(rows, columns, delimiter=',', chunk_rows=500):
+    """Yield CSV/TSV text a few hundred rows at a time; memory does not grow with row count"""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer, delimiter=delimiter)
+    writer.writerow([EXPORT_COLUMNS[c] for c in columns])
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_cell(value) for value in row])
+        if i % chunk_rows == 0:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def ndjson_chunks(rows, columns, chunk_rows=500):
+    """Yield one JSON object per line (JSON Lines), keyed by column name"""
+    lines = []
+    for row in rows:
+        record = {}
+        for column, value in zip(columns, row):
+            record[column] = value.strftime("%Y-%m-%d %H:%M") if hasattr(value, 'strftime') else value
+        lines.append(json.dumps(record))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_chunks(rows, columns, fmt):
+    if fmt == 'ndjson':
+        return ndjson_chunks(rows, columns)
+    return delimited_chunks(rows, columns, delimiter='\t' if fmt == 'tsv' else ',')
+
+
+def gzip_chunks(chunks):
+    """Compress a text stream on the fly into a gzip file"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
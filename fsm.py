@@ -1,4 +1,106 @@
 # fsm.py - Complete Finite State Machine for Task Reminder Bot
+#
+# The lifecycle is declared once in TRANSITIONS and compiled into an integer-coded
+# (event, state) -> state table. TaskReminderFSM tracks a single task; apply()
+# advances a whole batch of stored Task.fsm_state values with one event.
+
+STATES = (
+    "Idle",
+    "Task Added",
+    "Priority Assigned",
+    "Pending",
+    "Reminder Sent",
+    "Task Completed",
+    "Task Overdue",
+    "Task Repeated",
+    "Task Deleted",
+)
+
+EVENTS = (
+    "add_task",
+    "assign_priority",
+    "set_pending",
+    "trigger_reminder",
+    "complete_task",
+    "repeat_task",
+    "delete_task",
+    "edit_task",
+    "mark_overdue",
+)
+
+# state -> {event: new state}
+TRANSITIONS = {
+    "Idle": {"add_task": "Task Added"},
+    "Task Added": {"assign_priority": "Priority Assigned", "delete_task": "Task Deleted"},
+    "Priority Assigned": {"set_pending": "Pending", "delete_task": "Task Deleted"},
+    "Pending": {
+        "trigger_reminder": "Reminder Sent",
+        "complete_task": "Task Completed",
+        "delete_task": "Task Deleted",
+        "edit_task": "Priority Assigned",  # Re-evaluate priority after edit
+        "mark_overdue": "Task Overdue",
+    },
+    "Reminder Sent": {
+        "complete_task": "Task Completed",
+        "repeat_task": "Task Repeated",
+        "delete_task": "Task Deleted",
+        "mark_overdue": "Task Overdue",
+    },
+    "Task Completed": {"repeat_task": "Task Repeated"},
+    "Task Overdue": {"complete_task": "Task Completed", "repeat_task": "Task Repeated", "delete_task": "Task Deleted"},
+    "Task Repeated": {"set_pending": "Pending"},
+    "Task Deleted": {},
+}
+
+INVALID = -1
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+EVENT_CODES = {event: code for code, event in enumerate(EVENTS)}
+
+# TRANSITION_TABLE[event_code][state_code] -> new state code, or INVALID
+TRANSITION_TABLE = tuple(
+    tuple(STATE_CODES[TRANSITIONS[state][event]] if event in TRANSITIONS[state] else INVALID for state in STATES)
+    for event in EVENTS
+)
+
+# Same table keyed by name, for callers holding the strings stored in Task.fsm_state
+_NEXT_STATE = {
+    event: {STATES[code]: STATES[new] for code, new in enumerate(row) if new != INVALID}
+    for event, row in zip(EVENTS, TRANSITION_TABLE)
+}
+
+
+def _event_code(event):
+    code = EVENT_CODES.get(event)
+    if code is None:
+        raise ValueError(f"Unknown FSM event: {event}")
+    return code
+
+
+def apply(states, event):
+    """
+    Advance many task states with one event.
+
+    Args:
+        states: iterable of state names (e.g. Task.fsm_state values)
+        event: event applied to every state
+
+    Returns:
+        list of new state names, None where the transition is not allowed
+    """
+    step = _NEXT_STATE[EVENTS[_event_code(event)]]
+    return [step.get(state) for state in states]
+
+
+def sources(event):
+    """States that allow `event`, e.g. for an SQL `fsm_state IN (...)` guard"""
+    return tuple(_NEXT_STATE[EVENTS[_event_code(event)]])
+
+
+def apply_codes(codes, event):
+    """Integer-coded variant of apply(): state codes in, state codes (or INVALID) out"""
+    row = TRANSITION_TABLE[_event_code(event)]
+    return [row[code] for code in codes]
+
 
 class TaskReminderFSM:
     """
@@ -14,23 +116,25 @@ class TaskReminderFSM:
     - Task Overdue: Deadline passed without completion
     - Task Repeated: Recurring task created new instance
     - Task Deleted: User removed task
+
+    Args:
+        logger: optional logging.Logger; transitions are silent without one
     """
 
-    def __init__(self):
-        self.state = "Idle"
+    __slots__ = ('_code', 'state_history', 'logger')
+
+    valid_transitions = {state: list(events) for state, events in TRANSITIONS.items()}
+
+    def __init__(self, logger=None):
+        self._code = STATE_CODES["Idle"]
         self.state_history = ["Idle"]
-        self.valid_transitions = {
-            "Idle": ["add_task"],
-            "Task Added": ["assign_priority", "delete_task"],
-            "Priority Assigned": ["set_pending", "delete_task"],
-            "Pending": ["trigger_reminder", "complete_task", "delete_task", "edit_task", "mark_overdue"],
-            "Reminder Sent": ["complete_task", "repeat_task", "delete_task", "mark_overdue"],
-            "Task Completed": ["repeat_task"],
-            "Task Overdue": ["complete_task", "repeat_task", "delete_task"],
-            "Task Repeated": ["set_pending"],
-            "Task Deleted": []
-        }
-        print(f"[FSM] Initialized in state: {self.state}")
+        self.logger = logger
+        if logger:
+            logger.info("[FSM] Initialized in state: %s", self.state)
+
+    @property
+    def state(self):
+        return STATES[self._code]
 
     def transition(self, event, task_info=""):
         """
@@ -40,55 +144,21 @@ class TaskReminderFSM:
             event: The event triggering transition
             task_info: Optional task description for logging
         """
-        current_state = self.state
-        new_state = None
+        event_code = EVENT_CODES.get(event)
+        new_code = INVALID if event_code is None else TRANSITION_TABLE[event_code][self._code]
 
-        # Check if transition is valid
-        if event not in self.valid_transitions.get(self.state, []):
-            print(f"[FSM] ⚠️ Invalid transition: {event} from state '{self.state}'")
+        if new_code == INVALID:
+            if self.logger:
+                self.logger.warning("[FSM] ⚠️ Invalid transition: %s from state '%s'", event, self.state)
             return False
 
-        # Define state transitions
-        if self.state == "Idle" and event == "add_task":
-            new_state = "Task Added"
-
-        elif self.state == "Task Added" and event == "assign_priority":
-            new_state = "Priority Assigned"
-
-        elif self.state == "Priority Assigned" and event == "set_pending":
-            new_state = "Pending"
-
-        elif self.state == "Pending" and event == "trigger_reminder":
-            new_state = "Reminder Sent"
-
-        elif self.state in ["Pending", "Reminder Sent"] and event == "mark_overdue":
-            new_state = "Task Overdue"
-
-        elif self.state in ["Pending", "Reminder Sent", "Task Overdue"] and event == "complete_task":
-            new_state = "Task Completed"
-
-        elif self.state in ["Task Completed", "Reminder Sent", "Task Overdue"] and event == "repeat_task":
-            new_state = "Task Repeated"
-
-        elif self.state == "Task Repeated" and event == "set_pending":
-            new_state = "Pending"
-
-        elif event == "delete_task":
-            new_state = "Task Deleted"
-
-        elif self.state == "Pending" and event == "edit_task":
-            new_state = "Priority Assigned"  # Re-evaluate priority after edit
-
-        # Perform transition
-        if new_state:
-            self.state = new_state
-            self.state_history.append(new_state)
+        current_state = self.state
+        self._code = new_code
+        self.state_history.append(STATES[new_code])
+        if self.logger:
             task_str = f" [{task_info}]" if task_info else ""
-            print(f"[FSM] ✅ {current_state} --({event})--> {new_state}{task_str}")
-            return True
-        else:
-            print(f"[FSM] ❌ No transition defined for '{event}' from '{self.state}'")
-            return False
+            self.logger.info("[FSM] ✅ %s --(%s)--> %s%s", current_state, event, STATES[new_code], task_str)
+        return True
 
     def get_state(self):
         """Return current state"""
@@ -100,26 +170,36 @@ class TaskReminderFSM:
 
     def reset(self):
         """Reset FSM to initial state"""
-        self.state = "Idle"
+        self._code = STATE_CODES["Idle"]
         self.state_history = ["Idle"]
-        print("[FSM] 🔄 Reset to Idle state")
+        if self.logger:
+            self.logger.info("[FSM] 🔄 Reset to Idle state")
 
     def can_transition(self, event):
         """Check if a transition is valid without performing it"""
-        return event in self.valid_transitions.get(self.state, [])
+        event_code = EVENT_CODES.get(event)
+        return event_code is not None and TRANSITION_TABLE[event_code][self._code] != INVALID
 
     def get_valid_transitions(self):
         """Get list of valid transitions from current state"""
-        return self.valid_transitions.get(self.state, [])
+        return self.valid_transitions[self.state]
 
 
 # Example usage and testing
 if __name__ == "__main__":
+    import contextlib
+    import io
+    import logging
+    import random
+    import time
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     print("=" * 60)
     print("Testing Task Reminder FSM")
     print("=" * 60)
 
-    fsm = TaskReminderFSM()
+    fsm = TaskReminderFSM(logger=logging.getLogger("fsm"))
 
     # Test Case 1: Normal task flow
     print("\n--- Test Case 1: Normal Task Flow ---")
@@ -165,4 +245,63 @@ if __name__ == "__main__":
     print("\n--- Final State History ---")
     print(f"History: {' -> '.join(fsm.get_history())}")
     print(f"Current State: {fsm.get_state()}")
-    print(f"Valid next transitions: {fsm.get_valid_transitions()}")
\ No newline at end of file
+    print(f"Valid next transitions: {fsm.get_valid_transitions()}")
+
+    # The previous if/elif implementation, kept here as the benchmark baseline
+    def legacy_next_state(state, event):
+        if event not in TaskReminderFSM.valid_transitions.get(state, []):
+            print(f"[FSM] ⚠️ Invalid transition: {event} from state '{state}'")
+            return None
+        new_state = None
+        if state == "Idle" and event == "add_task":
+            new_state = "Task Added"
+        elif state == "Task Added" and event == "assign_priority":
+            new_state = "Priority Assigned"
+        elif state == "Priority Assigned" and event == "set_pending":
+            new_state = "Pending"
+        elif state == "Pending" and event == "trigger_reminder":
+            new_state = "Reminder Sent"
+        elif state in ["Pending", "Reminder Sent"] and event == "mark_overdue":
+            new_state = "Task Overdue"
+        elif state in ["Pending", "Reminder Sent", "Task Overdue"] and event == "complete_task":
+            new_state = "Task Completed"
+        elif state in ["Task Completed", "Reminder Sent", "Task Overdue"] and event == "repeat_task":
+            new_state = "Task Repeated"
+        elif state == "Task Repeated" and event == "set_pending":
+            new_state = "Pending"
+        elif event == "delete_task":
+            new_state = "Task Deleted"
+        elif state == "Pending" and event == "edit_task":
+            new_state = "Priority Assigned"
+        print(f"[FSM] ✅ {state} --({event})--> {new_state}")
+        return new_state
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for state in STATES:
+            for event in EVENTS:
+                assert legacy_next_state(state, event) == apply([state], event)[0], (state, event)
+
+    print("\n" + "=" * 60)
+    print("Batch transitions: legacy per-task transition() vs apply() (ms)")
+    print("=" * 60)
+    random.seed(7)
+    for count in (1000, 10000, 100000):
+        states = random.choices(["Pending", "Reminder Sent", "Task Overdue", "Task Completed"], k=count)
+        for event in ("mark_overdue", "trigger_reminder"):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                legacy = [legacy_next_state(state, event) for state in states]
+            legacy_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            compiled = apply(states, event)
+            compiled_ms = (time.perf_counter() - start) * 1000
+
+            codes = [STATE_CODES[state] for state in states]
+            start = time.perf_counter()
+            apply_codes(codes, event)
+            codes_ms = (time.perf_counter() - start) * 1000
+
+            assert legacy == compiled
+            print(f"{count:>7} tasks {event:<17} legacy {legacy_ms:8.2f}   apply {compiled_ms:7.2f}"
+                  f"   apply_codes {codes_ms:7.2f}")
@@ -0,0 +1,23 @@
+# gunicorn.conf.py - Read by `gunicorn wsgi:app` from this directory
+#
+# /notifications/stream keeps its response open for as long as the tab is, so
+# sync workers (one request each) would be used up by a few open tabs. Threaded
+# workers serve one stream per thread, at most SSE_MAX_STREAMS of them (16 of the
+# 32 threads by default) so the other routes always keep threads; tabs over the
+# limit get a 503 and poll /check-local-notifications. Raise both together for
+# more streams per worker.
+
+import os
+import subprocess
+import sys
+
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+
+def on_starting(server):
+    """Create and upgrade the databases once, before any worker imports the app"""
+    # In a child process, so the master holds no connections for the workers to inherit
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
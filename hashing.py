@@ -0,0 +1,219 @@
+# hashing.py - Password hashing off the request thread
+#
+# pbkdf2 at a real iteration count costs tens of milliseconds of CPU per call. Hashes
+# and verifications run in a small process pool instead of on the request thread,
+# and at most `max_pending` of them may be queued or running at once: beyond that
+# callers get PasswordHasherBusy immediately, so a login storm turns into fast 429s
+# instead of a worker whose every route waits behind the hashing backlog.
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes queued; the caller should answer 429 and let the client retry"""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+def _warm_up():
+    return None
+
+
+def hash_method(iterations):
+    return f"pbkdf2:sha256:{int(iterations)}"
+
+
+def needs_rehash(pwhash, iterations):
+    """Whether a stored hash was made with another method or iteration count than configured"""
+    return pwhash.split('$', 1)[0] != hash_method(iterations)
+
+
+class PasswordHasher:
+    """
+    Bounded process pool for pbkdf2 hashing and verification.
+
+    Args:
+        iterations: pbkdf2-sha256 rounds for new hashes
+        workers: processes in the pool; 0 hashes inline on the calling thread
+        max_pending: hashes queued or running before new ones are rejected
+        timeout: seconds a caller waits for its result
+    """
+
+    def __init__(self, iterations=600000, workers=2, max_pending=32, timeout=10):
+        self.method = hash_method(iterations)
+        self.iterations = iterations
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._counts_lock = threading.Lock()  # Separate: done callbacks run inside stop()
+        self._pool = None
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the app process already runs scheduler and worker threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def start(self):
+        """Start the worker processes now instead of on the first login"""
+        if self.workers:
+            for future in [self._executor().submit(_warm_up) for _ in range(self.workers)]:
+                future.result()
+
+    def stop(self):
+        with self._lock:
+            if self._pool:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _count(self, name, delta=1):
+        with self._counts_lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def _finished(self, future=None):
+        """Free the job's slot once it has really stopped running (not when its caller gave up)"""
+        with self._counts_lock:
+            self.pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordHasherBusy()
+        self._count('pending')
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._finished()
+
+        try:
+            future = self._executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self._finished()
+            self.stop()
+            raise PasswordHasherBusy()
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The job keeps its slot until the pool gets to it, so max_pending still bounds the backlog
+            raise PasswordHasherBusy()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool for the next caller
+            self.stop()
+            raise PasswordHasherBusy()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(_verify, pwhash, password)
+
+    def verify_and_update(self, pwhash, password):
+        """
+        Check a password and, when its stored hash is out of date, rehash it.
+
+        Returns:
+            (valid, new_hash); new_hash is None unless the stored hash should be replaced
+        """
+        if not self.verify(pwhash, password):
+            return False, None
+        if not needs_rehash(pwhash, self.iterations):
+            return True, None
+        try:
+            new_hash = self.hash(password)
+        except PasswordHasherBusy:
+            return True, None  # The login still succeeds; the upgrade waits for a quieter moment
+        self._count('rehashed')
+        return True, new_hash
+
+    def stats(self):
+        with self._counts_lock:
+            return {
+                "iterations": self.iterations,
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+            }
+
+
+# Latency check: a cheap route's response time during a login storm, inline vs pooled hashing
+if __name__ == "__main__":
+    import json
+    import statistics
+    import time
+
+    iterations = 600000
+    stored = generate_password_hash('correct horse', method=hash_method(iterations))
+
+    def cheap_route():
+        # Stand-in for a non-auth request: a little Python work, like rendering a small JSON page
+        return json.dumps([{'id': i, 'description': f"Task {i}", 'status': 'Pending'} for i in range(200)])
+
+    def storm(verify, threads, seconds):
+        """Run `threads` login loops for `seconds` while timing cheap_route() on this thread"""
+        stop = time.monotonic() + seconds
+        logins = {'ok': [], 'rejected': 0}
+
+        def login_loop():
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    verify(stored, 'correct horse')
+                    logins['ok'].append(time.perf_counter() - start)
+                except PasswordHasherBusy:
+                    logins['rejected'] += 1
+                    time.sleep(0.01)
+
+        workers = [threading.Thread(target=login_loop) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        latencies = []
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            cheap_route()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.005)
+        for worker in workers:
+            worker.join()
+        latencies.sort()
+        return (statistics.median(latencies), latencies[int(len(latencies) * 0.99)], logins)
+
+    print("=" * 60)
+    print(f"Non-auth route latency during a login storm, pbkdf2 {iterations} rounds (ms)")
+    print("=" * 60)
+    idle = storm(lambda *args: None, 0, 2)
+    print(f"{'no logins':<28} p50 {idle[0]:6.2f}   p99 {idle[1]:6.2f}")
+
+    pooled = PasswordHasher(iterations, workers=2, max_pending=8)
+    pooled.start()
+    for threads in (8, 32):
+        inline = storm(check_password_hash, threads, 5)
+        pool = storm(pooled.verify, threads, 5)
+        for name, (p50, p99, logins) in (('inline', inline), ('pooled', pool)):
+            print(f"{threads:>3} login threads {name:<9} p50 {p50:6.2f}   p99 {p99:6.2f}"
+                  f"   logins {len(logins['ok'])} (max {max(logins['ok'], default=0):.1f}s), 429s {logins['rejected']}")
+    pooled.stop()
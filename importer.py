@@ -0,0 +1,109 @@
+# importer.py - Streaming parsers and validation for bulk task imports
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from exporter import EXPORT_COLUMNS
+
+# Accept both export headers ("Remind Time") and column names ("remind_time")
+HEADER_TO_COLUMN = {header: column for column, header in EXPORT_COLUMNS.items()}
+HEADER_TO_COLUMN.update({column: column for column in EXPORT_COLUMNS})
+HEADER_TO_COLUMN.update({"Reminder Offset": 'reminder_offset', 'reminder_offset': 'reminder_offset'})
+
+VALID_REPEATS = ('once', 'daily', 'weekly', 'monthly')
+VALID_ALERT_TYPES = ('email', 'browser', 'both')
+VALID_STATUSES = ('Pending', 'Completed', 'Overdue', 'Archived')
+
+# FSM state recorded for imported rows, matching what the app would have set
+STATUS_FSM_STATES = {
+    'Pending': 'Pending',
+    'Completed': 'Task Completed',
+    'Overdue': 'Task Overdue',
+    'Archived': 'Task Repeated',
+}
+
+
+def iter_records(stream, fmt):
+    """
+    Lazily parse an uploaded binary stream.
+
+    Yields:
+        (line_number, dict keyed by task column name) - rows are never all held in memory
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, {HEADER_TO_COLUMN.get(k, k): v for k, v in record.items() if k is not None}
+    else:
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+                continue
+            if not isinstance(record, dict):
+                yield line_number, ValueError("expected a JSON object")
+                continue
+            yield line_number, {HEADER_TO_COLUMN.get(k, k): v for k, v in record.items()}
+
+
+def _parse_time(value, field, required=True):
+    if value in (None, '', 'N/A'):
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"{field} must look like YYYY-MM-DD HH:MM")
+
+
+def _choice(record, field, choices, default):
+    value = record.get(field) or default
+    if value not in choices:
+        raise ValueError(f"{field} must be one of {', '.join(choices)}")
+    return value
+
+
+def validate_record(record):
+    """
+    Check one parsed record and convert it into Task column values.
+    Priority and reminder_at are filled in later, in batch.
+
+    Raises:
+        ValueError: with a message suitable for the per-row error report
+    """
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+
+    description = (record.get('description') or '').strip()
+    if not description:
+        raise ValueError("description is required")
+    if len(description) > 200:
+        raise ValueError("description is longer than 200 characters")
+
+    try:
+        reminder_offset = int(record.get('reminder_offset') or 5)
+    except (TypeError, ValueError):
+        raise ValueError("reminder_offset must be a whole number of minutes")
+    if reminder_offset < 0:
+        raise ValueError("reminder_offset cannot be negative")
+
+    status = _choice(record, 'status', VALID_STATUSES, 'Pending')
+    return {
+        'description': description,
+        'remind_time': _parse_time(record.get('remind_time'), 'remind_time'),
+        'reminder_offset': reminder_offset,
+        'status': status,
+        'repeat': _choice(record, 'repeat', VALID_REPEATS, 'once'),
+        'alert_type': _choice(record, 'alert_type', VALID_ALERT_TYPES, 'both'),
+        'fsm_state': STATUS_FSM_STATES[status],
+        'created_at': _parse_time(record.get('created_at'), 'created_at', required=False),
+    }
@@ -0,0 +1,51 @@
+# leader.py - Lease-based leader election so periodic jobs run in one process at a time
+
+import functools
+import os
+import socket
+import uuid
+
+
+class LeaderElection:
+    """
+    Every process competes for the same named lease; whoever holds it runs the
+    leader-only jobs. The holder renews the lease on each heartbeat, and if it
+    dies the lease expires and another process takes over on its next heartbeat.
+
+    Args:
+        try_acquire: callable(holder) -> bool that atomically takes or renews the
+            lease when it is free, expired or already ours
+        release: callable(holder) that gives the lease up early (clean shutdown)
+    """
+
+    def __init__(self, try_acquire, release=None):
+        self.try_acquire = try_acquire
+        self.release = release
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+    def heartbeat(self):
+        try:
+            leader = self.try_acquire(self.holder)
+        except Exception as e:
+            print(f"[Leader] ❌ Heartbeat failed: {e}")
+            leader = False
+
+        if leader != self.is_leader:
+            print(f"[Leader] {'👑 Acquired' if leader else '⚠️ Lost'} scheduler lease ({self.holder})")
+        self.is_leader = leader
+        return leader
+
+    def resign(self):
+        if self.is_leader and self.release:
+            self.release(self.holder)
+        self.is_leader = False
+
+    def leader_only(self, job):
+        """Wrap a job so it silently does nothing unless this process is the leader"""
+        @functools.wraps(job)
+        def run():
+            if self.is_leader:
+                return job()
+            return None
+        return run
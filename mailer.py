@@ -0,0 +1,280 @@
+# mailer.py - Pooled SMTP transport and background workers for the email outbox
+
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SMTPConnectionPool:
+    """
+    Keeps a few authenticated SMTP connections open and hands them out for reuse,
+    so a batch of reminders pays for one TLS handshake and login instead of one
+    per message.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True, size=2, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.username:
+            server.login(self.username, self.password)
+        return server
+
+    @staticmethod
+    def _is_alive(server):
+        try:
+            return server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """Borrow a live connection; it is discarded instead of returned if anything fails"""
+        server = None
+        while server is None:
+            try:
+                candidate = self._idle.get_nowait()
+            except queue.Empty:
+                server = self._connect()
+                break
+            if self._is_alive(candidate):
+                server = candidate
+            else:
+                self._close(candidate)
+
+        try:
+            yield server
+        except Exception:
+            self._close(server)
+            raise
+
+        try:
+            self._idle.put_nowait(server)
+        except queue.Full:
+            self._close(server)
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class RateLimiter:
+    """Token bucket limiting how many messages per second go to one provider"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class NotAttempted(str):
+    """
+    send_batch() result for a message the batch stopped before; not a failed attempt
+    of that message. `retry_after` is the provider's backoff in seconds.
+    """
+
+    def __new__(cls, error, retry_after=0):
+        result = super().__new__(cls, error)
+        result.retry_after = retry_after
+        return result
+
+
+class MailProvider:
+    """One outgoing SMTP provider: its connection pool plus its rate limit"""
+
+    def __init__(self, pool, rate_limiter):
+        self.pool = pool
+        self.rate_limiter = rate_limiter
+        self._outages = 0  # Consecutive batches stopped by connect/login failures
+
+    def send_batch(self, messages):
+        """
+        Send (key, sender, recipient, message_string) tuples over a pooled connection.
+
+        A message the server rejects (bad address, content refused) fails alone and
+        the connection is reused. A connection that drops mid-batch fails the message
+        being sent and the rest go out on a new one. If connecting or logging in fails,
+        or a new connection fails again before the server answers any message, the
+        batch stops there: every message left gets a NotAttempted result instead of
+        one login attempt each, with a backoff that grows while the outage lasts.
+
+        Returns:
+            dict mapping each key to None on success or the error string on failure
+        """
+        results = {}
+        pending = list(messages)
+        while pending:
+            connected = answered = False
+            try:
+                with self.pool.connection() as server:
+                    connected = True
+                    self._outages = 0
+                    while pending:
+                        key, sender, recipient, body = pending[0]
+                        self.rate_limiter.acquire()
+                        try:
+                            server.sendmail(sender, [recipient], body)
+                            results[key] = None
+                        except smtplib.SMTPRecipientsRefused as e:
+                            results[key] = str(e)  # Bad address; the connection is still fine
+                        except smtplib.SMTPResponseException as e:
+                            if e.smtp_code == 421:
+                                raise  # Server is closing the connection
+                            results[key] = str(e)  # Sender or content refused; smtplib has reset the session
+                        answered = True
+                        pending.pop(0)
+            except Exception as e:
+                if connected:
+                    # Connection-level failure: fail the current message
+                    key = pending.pop(0)[0]
+                    results[key] = str(e)
+                if not connected or not answered:
+                    # Can't connect or log in: don't retry per message (lockouts, connect timeouts)
+                    self._outages += 1
+                    for key, *_ in pending:
+                        results[key] = NotAttempted(f"not attempted: {e}", retry_delay(self._outages))
+                    break
+        return results
+
+
+def retry_delay(attempts, base=30, cap=3600):
+    """Exponential backoff in seconds after the given number of failed attempts"""
+    return min(cap, base * (2 ** max(attempts - 1, 0)))
+
+
+class OutboxWorkerPool:
+    """
+    Background threads that repeatedly call `process_batch` until the outbox is
+    drained, then sleep until woken by a new enqueue or the poll interval passes.
+
+    Args:
+        process_batch: callable that sends one batch and returns how many rows it handled
+        workers: number of worker threads
+        poll_interval: seconds between checks when the outbox is empty (picks up retries)
+    """
+
+    def __init__(self, process_batch, workers=2, poll_interval=5):
+        self.process_batch = process_batch
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'outbox-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[Outbox] Started {self.workers} workers")
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def wake(self):
+        """Signal that new messages were enqueued"""
+        self._wake.set()
+
+    def _run(self):
+        while self._running:
+            try:
+                handled = self.process_batch()
+            except Exception as e:
+                print(f"[Outbox] ❌ Batch failed: {e}")
+                handled = 0
+            if handled:
+                continue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+# Throughput check against a local stand-in SMTP server
+if __name__ == "__main__":
+    from email.mime.text import MIMEText
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("aiosmtpd is required for the throughput check: pip install aiosmtpd")
+
+    class _Sink:
+        async def handle_DATA(self, server, session, envelope):
+            return '250 OK'
+
+    controller = Controller(_Sink(), hostname='127.0.0.1', port=8025)
+    controller.start()
+
+    count = 500
+    messages = []
+    for i in range(count):
+        msg = MIMEText(f"Reminder: task {i}")
+        msg['Subject'] = "Task Reminder"
+        messages.append((i, 'bot@example.com', f'user{i}@example.com', msg.as_string()))
+
+    print("=" * 60)
+    print(f"SMTP throughput, {count} messages")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    for _, sender, recipient, body in messages:
+        with smtplib.SMTP('127.0.0.1', 8025) as server:
+            server.sendmail(sender, [recipient], body)
+    elapsed = time.perf_counter() - start
+    print(f"Connection per message: {count / elapsed:8.1f} msg/s")
+
+    provider = MailProvider(SMTPConnectionPool('127.0.0.1', 8025, use_ssl=False), RateLimiter(0))
+    start = time.perf_counter()
+    results = provider.send_batch(messages)
+    elapsed = time.perf_counter() - start
+    print(f"Pooled batch:           {count / elapsed:8.1f} msg/s "
+          f"({sum(1 for r in results.values() if r is None)} sent)")
+
+    provider.pool.close_all()
+    controller.stop()
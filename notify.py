@@ -0,0 +1,248 @@
+# notify.py - Per-user fan-out of browser notifications for Server-Sent Events streams
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+class StreamLimitReached(Exception):
+    """This process already holds its maximum of open streams; the client should poll instead"""
+
+
+class Subscription:
+    """
+    One connected client (browser tab). Events wait in a bounded buffer; if the
+    client falls behind, the oldest events are dropped instead of growing memory.
+    """
+
+    def __init__(self, user_id, buffer_size):
+        self.user_id = user_id
+        self.dropped = 0
+        self._events = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """Wait up to `timeout` seconds and return every buffered event (possibly none)"""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+
+class SQLiteEventChannel:
+    """
+    Notification log in a small SQLite file shared by every worker process on the
+    host. A reminder fired in one worker reaches streams held open by any other:
+    each broker polls the log for rows past the last one it delivered.
+
+    Row ids are the event ids, so they are ordered across processes and restarts.
+    """
+
+    def __init__(self, path, ttl=3600, purge_interval=60):
+        self.path = path
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS notification_event (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "user_id INTEGER NOT NULL, data TEXT NOT NULL, created_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_notification_event_user_id ON notification_event (user_id, id)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, user_id, data):
+        """Store one event and return its id"""
+        now = time.time()
+        conn = self._connection()
+        if now - self._last_purge > self.purge_interval:
+            self._last_purge = now
+            conn.execute("DELETE FROM notification_event WHERE created_at <= ?", (now - self.ttl,))
+        cursor = conn.execute("INSERT INTO notification_event (user_id, data, created_at) VALUES (?, ?, ?)",
+                              (user_id, json.dumps(data), now))
+        return cursor.lastrowid
+
+    def last_id(self):
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM notification_event").fetchone()[0]
+
+    def after(self, event_id, limit=1000):
+        """Every user's events with an id above `event_id`: [(id, user_id, data), ...]"""
+        rows = self._connection().execute(
+            "SELECT id, user_id, data FROM notification_event WHERE id > ? ORDER BY id LIMIT ?",
+            (event_id, limit)).fetchall()
+        return [(event_id, user_id, json.loads(data)) for event_id, user_id, data in rows]
+
+    def history(self, user_id, after_id, upto_id, limit):
+        """The user's latest `limit` events with after_id < id <= upto_id, oldest first"""
+        rows = self._connection().execute(
+            "SELECT id, data FROM notification_event WHERE user_id = ? AND id > ? AND id <= ? "
+            "ORDER BY id DESC LIMIT ?", (user_id, after_id, upto_id, limit)).fetchall()
+        return [(event_id, json.loads(data)) for event_id, data in reversed(rows)]
+
+
+def make_notification_channel(url, ttl=3600):
+    """
+    Build a channel from a config string:
+        'memory'                 - none; events only reach streams in the publishing process
+        'sqlite:///path/to/file' - SQLiteEventChannel shared between processes
+    """
+    if url == 'memory':
+        return None
+    if url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SQLiteEventChannel(path, ttl=ttl)
+    raise ValueError(f"Unsupported notification channel: {url}")
+
+
+class NotificationBroker:
+    """
+    Publishes notifications to every open stream of a user and keeps a short
+    per-user history so reconnecting clients can replay what they missed
+    (via the SSE Last-Event-ID header).
+
+    Without a channel, events stay in this process and their ids are millisecond
+    timestamps made strictly increasing, so they keep ordering across restarts.
+    With a channel, publish() only appends to it; a poller thread delivers every
+    process's events to the local streams and replays come from the channel.
+    """
+
+    def __init__(self, replay_size=50, buffer_size=100, channel=None, poll_interval=0.5, max_connections=None):
+        self.replay_size = replay_size
+        self.buffer_size = buffer_size
+        self.max_connections = max_connections
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._history = {}
+        self._subscribers = {}
+        self._connections = 0
+        self._rejected = 0
+        self._published = 0
+        self._delivered_id = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _new_id(self):
+        self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+        return self._last_id
+
+    def publish(self, user_id, data):
+        if self.channel is not None:
+            event_id = self.channel.append(user_id, data)
+            with self._lock:
+                self._published += 1
+            return event_id
+
+        with self._lock:
+            event = (self._new_id(), data)
+            history = self._history.get(user_id)
+            if history is None:
+                history = self._history[user_id] = deque(maxlen=self.replay_size)
+            history.append(event)
+            subscribers = list(self._subscribers.get(user_id, ()))
+            self._published += 1
+
+        for subscription in subscribers:
+            subscription.put(event)
+        return event[0]
+
+    def subscribe(self, user_id, last_event_id=None):
+        """
+        Register a client; events newer than `last_event_id` are replayed into its buffer.
+
+        Raises:
+            StreamLimitReached: `max_connections` streams are already open in this process
+        """
+        subscription = Subscription(user_id, self.buffer_size)
+        with self._lock:
+            if self.max_connections is not None and self._connections >= self.max_connections:
+                self._rejected += 1
+                raise StreamLimitReached()
+            self._connections += 1
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            if last_event_id is not None and self.channel is not None:
+                # The poller delivers everything past _delivered_id; replay up to it
+                for event in self.channel.history(user_id, last_event_id, self._delivered_id, self.replay_size):
+                    subscription.put(event)
+            elif last_event_id is not None:
+                for event in self._history.get(user_id, ()):
+                    if event[0] > last_event_id:
+                        subscription.put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None and subscription in subscribers:
+                self._connections -= 1
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    # Channel poller
+    def start(self):
+        if self.channel is None or self._thread is not None:
+            return
+        self._delivered_id = self.channel.last_id()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='notification-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[Notify] ❌ Channel poll failed: {e}")
+
+    def poll(self):
+        """Deliver channel events published since the last poll to this process's streams"""
+        events = self.channel.after(self._delivered_id)
+        while events:
+            deliveries = []
+            with self._lock:
+                for event_id, user_id, data in events:
+                    self._delivered_id = event_id
+                    for subscription in self._subscribers.get(user_id, ()):
+                        deliveries.append((subscription, (event_id, data)))
+            for subscription, event in deliveries:
+                subscription.put(event)
+            events = self.channel.after(self._delivered_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connections": self._connections,
+                "max_connections": self.max_connections,
+                "rejected": self._rejected,
+                "users_connected": len(self._subscribers),
+                "published": self._published,
+            }
@@ -0,0 +1,131 @@
+# pagination.py - Keyset (cursor) pagination for task listings
+#
+# A page is "the next N rows after the last row the client saw", expressed as a
+# row-value comparison on the sort key, e.g. (remind_time, id) > (:t, :id). The
+# database seeks straight to that point in the index instead of counting past
+# OFFSET rows, so page 500 costs the same as page 1.
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe token for the sort key of the last row on a page"""
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, types):
+    """
+    Sort key values from a cursor token.
+
+    Args:
+        token: value produced by encode_cursor()
+        types: one parser per key column, e.g. (datetime.fromisoformat, int)
+
+    Raises:
+        ValueError: the token is malformed or does not match `types`
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    try:
+        return [parse(value) for parse, value in zip(types, values)]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(session, statement, keys, after=None, page_size=50):
+    """
+    Fetch one page of `statement` ordered by `keys`.
+
+    Args:
+        statement: select() including every key column; it must not be ordered already
+        keys: ascending sort key columns, ending in a unique one (normally the id)
+        after: decoded cursor values of the previous page's last row, None for the first page
+
+    Returns:
+        (rows, next_cursor); next_cursor is None on the last page
+    """
+    if after is not None:
+        statement = statement.where(tuple_(*keys) > tuple_(*after))
+    # One extra row tells us whether another page exists without a COUNT
+    rows = session.execute(statement.order_by(*keys).limit(page_size + 1)).all()
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]._mapping
+    return rows, encode_cursor([last[key] for key in keys])
+
+
+# Latency check: OFFSET vs keyset pages at increasing depth on one user's tasks
+if __name__ == "__main__":
+    import tempfile
+    import time
+    from datetime import timedelta
+
+    from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table,
+                            create_engine, insert, select)
+    from sqlalchemy.orm import Session
+
+    metadata = MetaData()
+    task = Table(
+        'task', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('description', String(200)),
+        Column('user_id', Integer),
+        Column('remind_time', DateTime),
+        Column('priority', String(20)),
+        Column('status', String(20)),
+        Index('ix_task_user_remind_time', 'user_id', 'remind_time'),
+    )
+
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/pages.db")
+    metadata.create_all(engine)
+    base = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for start in range(0, 500000, 10000):
+            conn.execute(insert(task), [{'description': f"Task {i}", 'user_id': 1 if i % 2 else 2,
+                                         'remind_time': base + timedelta(minutes=(i * 7919) % 500000),
+                                         'priority': 'Medium', 'status': 'Pending'}
+                                        for i in range(start, start + 10000)])
+
+    page_size = 50
+    columns = select(task.c.id, task.c.description, task.c.remind_time, task.c.priority,
+                     task.c.status).where(task.c.user_id == 1)
+    keys = [task.c.remind_time, task.c.id]
+
+    print("=" * 60)
+    print(f"/tasks page latency at depth, {page_size} rows per page (ms)")
+    print("=" * 60)
+    with Session(engine) as session:
+        # Walk the cursor chain once so every depth has a real cursor to resume from
+        cursors = {0: None}
+        after, page = None, 0
+        while True:
+            rows, token = keyset_page(session, columns, keys, after, page_size)
+            page += 1
+            if token is None:
+                break
+            after = decode_cursor(token, (datetime.fromisoformat, int))
+            cursors[page] = after
+
+        for depth in (0, 10, 100, 1000, 4999):
+            start = time.perf_counter()
+            offset_rows = session.execute(
+                columns.order_by(*keys).offset(depth * page_size).limit(page_size)).all()
+            offset_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            keyset_rows, _ = keyset_page(session, columns, keys, cursors[depth], page_size)
+            keyset_ms = (time.perf_counter() - start) * 1000
+
+            assert [row.id for row in offset_rows] == [row.id for row in keyset_rows]
+            print(f"page {depth + 1:>5}   OFFSET {offset_ms:7.2f}   keyset {keyset_ms:6.2f}")
@@ -0,0 +1,68 @@
+# recurrence.py - Occurrence arithmetic for repeating tasks
+#
+# A recurring task is stored once, as a rule: the anchor (first occurrence) plus
+# the repeat kind. Occurrence n is always computed from the anchor, so monthly
+# series keep their day of month instead of drifting (Jan 31 -> Feb 28 -> Mar 31).
+
+import calendar
+from datetime import timedelta
+
+REPEAT_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+REPEATS = ('daily', 'weekly', 'monthly')
+
+
+def add_months(value, months):
+    """Same day `months` later, clamped to the last day of shorter months"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def nth_occurrence(anchor, repeat, n):
+    if repeat == 'monthly':
+        return add_months(anchor, n)
+    return anchor + REPEAT_STEPS[repeat] * n
+
+
+def _first_index_from(anchor, repeat, moment):
+    """Smallest n >= 0 whose occurrence is at or after `moment`, without walking the series"""
+    if moment <= anchor:
+        return 0
+    if repeat == 'monthly':
+        n = max((moment.year - anchor.year) * 12 + moment.month - anchor.month - 1, 0)
+    else:
+        n = (moment - anchor) // REPEAT_STEPS[repeat]
+    while nth_occurrence(anchor, repeat, n) < moment:
+        n += 1
+    return n
+
+
+def next_occurrence(anchor, repeat, after):
+    """First occurrence strictly after `after`, or None for tasks that do not repeat"""
+    if repeat not in REPEATS:
+        return None
+    n = _first_index_from(anchor, repeat, after)
+    occurrence = nth_occurrence(anchor, repeat, n)
+    return occurrence if occurrence > after else nth_occurrence(anchor, repeat, n + 1)
+
+
+def occurrences_between(anchor, repeat, window_start, window_end, limit=1000):
+    """
+    Yield the occurrences of a series anchored at `anchor` that fall inside
+    [window_start, window_end), without materializing anything outside it.
+    """
+    if repeat not in REPEATS:
+        if window_start <= anchor < window_end:
+            yield anchor
+        return
+
+    n = _first_index_from(anchor, repeat, window_start)
+    for _ in range(limit):
+        occurrence = nth_occurrence(anchor, repeat, n)
+        if occurrence >= window_end:
+            return
+        yield occurrence
+        n += 1
@@ -0,0 +1,162 @@
+# reminder_engine.py - In-process due-queue that fires reminders close to their exact time
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class ReminderEngine:
+    """
+    Min-heap of pending reminders keyed on their due time.
+
+    The engine keeps one live entry per task. Rescheduling or cancelling a task
+    simply replaces its entry in `_due`; the stale heap item is skipped when it
+    reaches the top (lazy deletion), so every operation stays O(log n). A failed
+    fire is retried later but keeps the reminder's original due time, which the
+    callback uses to tell a retry from a stale entry.
+
+    Args:
+        fire_callback: called with a list of (task_id, due_timestamp) tuples once
+            they are due; runs on the engine thread
+        loader: returns an iterable of (task_id, due_timestamp) used to fill the
+            queue on start; anything already due is fired immediately (catch-up)
+        max_latency: longest the engine sleeps between checks, in seconds
+    """
+
+    def __init__(self, fire_callback, loader=None, max_latency=1.0):
+        self.fire_callback = fire_callback
+        self.loader = loader
+        self.max_latency = max_latency
+
+        self._heap = []
+        self._due = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._loaded = loader is None
+        self._started_at = None
+
+        # Fire latency metrics (seconds between due time and actual firing)
+        self._fired = 0
+        self._caught_up = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    # Queue maintenance
+    def schedule(self, task_id, due):
+        """Add or move the reminder for a task"""
+        with self._cond:
+            self._push(task_id, due)
+            self._cond.notify()
+
+    def cancel(self, task_id):
+        """Drop the reminder for a task (if any)"""
+        with self._cond:
+            self._due.pop(task_id, None)
+
+    def load(self, items):
+        """Bulk-fill the queue, replacing any existing entries for the same tasks"""
+        with self._cond:
+            for task_id, due in items:
+                self._push(task_id, due)
+            self._cond.notify()
+
+    def _push(self, task_id, due, wake_at=None):
+        seq = next(self._counter)
+        self._due[task_id] = (due, seq)
+        heapq.heappush(self._heap, (due if wake_at is None else wake_at, seq, task_id, due))
+
+    def __len__(self):
+        return len(self._due)
+
+    # Lifecycle
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='reminder-engine', daemon=True)
+        self._thread.start()
+        print(f"[Engine] Started (max latency {self.max_latency}s)")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            if not self._loaded:
+                try:
+                    self.load(self.loader())
+                    self._loaded = True
+                    print(f"[Engine] Loaded {len(self)} pending reminders")
+                except Exception as e:
+                    print(f"[Engine] ❌ Load failed, retrying: {e}")
+                    time.sleep(5)
+                    continue
+
+            due_items = self._pop_due()
+            if due_items:
+                self._fire(due_items)
+                continue
+
+            with self._cond:
+                timeout = self.max_latency
+                if self._heap:
+                    timeout = min(timeout, max(self._heap[0][0] - time.time(), 0))
+                if self._running:
+                    self._cond.wait(timeout)
+
+    def _pop_due(self):
+        now = time.time()
+        items = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, task_id, due = heapq.heappop(self._heap)
+                if self._due.get(task_id) != (due, seq):
+                    continue  # Cancelled or rescheduled
+                del self._due[task_id]
+                items.append((task_id, due))
+        return items
+
+    def _fire(self, items):
+        fired_at = time.time()
+        try:
+            self.fire_callback(items)
+        except Exception as e:
+            print(f"[Engine] ❌ Fire failed for {len(items)} reminders, retrying: {e}")
+            retry_at = fired_at + max(self.max_latency, 5)
+            with self._cond:
+                for task_id, due in items:
+                    if task_id not in self._due:  # Not rescheduled while firing
+                        self._push(task_id, due, wake_at=retry_at)
+                self._cond.notify()
+            return
+
+        with self._cond:
+            for _, due in items:
+                if due < self._started_at:
+                    self._caught_up += 1
+                    continue
+                latency = max(fired_at - due, 0.0)
+                self._fired += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+
+    def stats(self):
+        """Queue size and fire latency figures"""
+        with self._cond:
+            return {
+                "queued": len(self._due),
+                "fired": self._fired,
+                "caught_up": self._caught_up,
+                "latency_avg": round(self._latency_total / self._fired, 4) if self._fired else 0.0,
+                "latency_max": round(self._latency_max, 4),
+                "max_latency": self.max_latency,
+            }
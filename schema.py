@@ -0,0 +1,304 @@
+# schema.py - In-place upgrades for databases created by older versions of the app
+#
+# db.create_all() only creates missing tables; it never adds columns or indexes
+# to a table that already exists, and SQLite cannot change a column's type.
+# Each step below is idempotent so it is safe to run on every start.
+
+from sqlalchemy import MetaData, String, inspect, text
+from sqlalchemy.exc import OperationalError
+
+
+def _columns(conn, table):
+    return {col['name']: col for col in inspect(conn).get_columns(table)}
+
+
+def _add_reminder_at(conn, metadata):
+    """Add and backfill the precomputed due-time column (remind_time - reminder_offset)"""
+    if 'reminder_at' in _columns(conn, 'task'):
+        return
+    conn.execute(text("ALTER TABLE task ADD COLUMN reminder_at VARCHAR(20)"))
+    conn.execute(text(
+        "UPDATE task SET reminder_at = strftime('%Y-%m-%d %H:%M', remind_time, "
+        "'-' || COALESCE(reminder_offset, 0) || ' minutes')"
+    ))
+    print("[Schema] ✅ Added task.reminder_at")
+
+
+def _convert_task_datetimes(conn, metadata):
+    """
+    Rebuild the task table with native DateTime columns.
+
+    Older databases stored remind_time/created_at/reminder_at as 'YYYY-MM-DD HH:MM'
+    strings. SQLite has no ALTER COLUMN TYPE, so the new table is created as
+    task_new, backfilled with a single INSERT ... SELECT, the old one dropped and
+    task_new renamed (SQLite's documented table rebuild). Renaming the old table
+    instead would repoint task_occurrence's foreign key at it.
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+    if not isinstance(_columns(conn, 'task')['remind_time']['type'], String):
+        return
+
+    # Index names would clash with the new table's; they are recreated on it
+    for index in inspect(conn).get_indexes('task'):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+    conn.execute(text("DROP TABLE IF EXISTS task_new"))
+    rebuild = MetaData()
+    metadata.tables['user'].to_metadata(rebuild)  # resolves task's foreign key; not created
+    metadata.tables['task'].to_metadata(rebuild, name='task_new').create(conn)
+
+    to_datetime = "strftime('%Y-%m-%d %H:%M:%S.000000', {0})"
+    conn.execute(text(f"""
+        INSERT INTO task_new (id, description, remind_time, reminder_offset, status, priority,
+                              repeat, alert_type, user_id, fsm_state, created_at, reminder_at)
+        SELECT id, description, {to_datetime.format('remind_time')}, reminder_offset, status, priority,
+               repeat, alert_type, user_id, fsm_state, {to_datetime.format('created_at')},
+               {to_datetime.format('reminder_at')}
+        FROM task
+    """))
+    conn.execute(text("DROP TABLE task"))
+    conn.execute(text("ALTER TABLE task_new RENAME TO task"))
+    print("[Schema] ✅ Converted task time columns to DateTime")
+
+
+def _repair_occurrence_foreign_key(conn, metadata):
+    """An earlier version of the rebuild above left task_occurrence referencing the dropped task_legacy"""
+    if conn.dialect.name != 'sqlite':
+        return
+    row = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'task_occurrence'")).first()
+    if not row or 'task_legacy' not in row[0]:
+        return
+    for index in inspect(conn).get_indexes('task_occurrence'):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+    rebuild = MetaData()
+    metadata.tables['task'].to_metadata(rebuild)
+    occurrence = metadata.tables['task_occurrence'].to_metadata(rebuild, name='task_occurrence_new')
+    occurrence.create(conn)
+    columns = ', '.join(column.name for column in occurrence.columns)
+    conn.execute(text(f"INSERT INTO task_occurrence_new ({columns}) SELECT {columns} FROM task_occurrence"))
+    conn.execute(text("DROP TABLE task_occurrence"))
+    conn.execute(text("ALTER TABLE task_occurrence_new RENAME TO task_occurrence"))
+    print("[Schema] ✅ Repointed task_occurrence's foreign key at task")
+
+
+def _add_updated_at(conn, metadata):
+    """Change timestamp used for calendar ETag/Last-Modified validators"""
+    if 'updated_at' not in _columns(conn, 'task'):
+        conn.execute(text("ALTER TABLE task ADD COLUMN updated_at DATETIME"))
+        print("[Schema] ✅ Added task.updated_at")
+    conn.execute(text("UPDATE task SET updated_at = created_at WHERE updated_at IS NULL"))
+
+
+def _add_importance(conn, metadata):
+    """Keyword weight used by the priority re-scoring job; the app backfills it on start"""
+    if 'importance' not in _columns(conn, 'task'):
+        conn.execute(text("ALTER TABLE task ADD COLUMN importance INTEGER"))
+        print("[Schema] ✅ Added task.importance")
+
+
+def _add_series_start(conn, metadata):
+    """Anchor of a recurring series; existing series are anchored at their current occurrence"""
+    if 'series_start' not in _columns(conn, 'task'):
+        conn.execute(text("ALTER TABLE task ADD COLUMN series_start DATETIME"))
+        print("[Schema] ✅ Added task.series_start")
+    conn.execute(text(
+        "UPDATE task SET series_start = remind_time "
+        "WHERE series_start IS NULL AND repeat != 'once' AND status = 'Pending'"
+    ))
+
+
+def _normalize_fsm_states(conn, metadata):
+    """Pending tasks used to stay in 'Task Added'; the FSM only fires reminders from 'Pending'"""
+    conn.execute(text(
+        "UPDATE task SET fsm_state = 'Pending' "
+        "WHERE status = 'Pending' AND fsm_state IN ('Idle', 'Task Added', 'Priority Assigned')"
+    ))
+
+
+TASK_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, description, user_id) VALUES (new.id, new.description, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, description, user_id)
+        VALUES ('delete', old.id, old.description, old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF description, user_id ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, description, user_id)
+        VALUES ('delete', old.id, old.description, old.user_id);
+        INSERT INTO task_fts(rowid, description, user_id) VALUES (new.id, new.description, new.user_id);
+    END""",
+]
+
+
+def _create_task_fts(conn, metadata):
+    """
+    FTS5 index over task descriptions, reading from the task table (external content)
+    and kept in sync by triggers. user_id is indexed too, so a search only walks the
+    postings of the current user's tasks.
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+    if not conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'task_fts'")).first():
+        try:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE task_fts USING fts5("
+                "description, user_id, content='task', content_rowid='id', prefix='2 3')"
+            ))
+        except OperationalError as e:
+            print(f"[Schema] ⚠️ FTS5 unavailable, task search falls back to LIKE: {e}")
+            return
+        conn.execute(text("INSERT INTO task_fts(task_fts) VALUES ('rebuild')"))
+        print("[Schema] ✅ Created task_fts full-text index")
+    for trigger in TASK_FTS_TRIGGERS:
+        conn.execute(text(trigger))
+
+
+def _create_task_indexes(conn, metadata):
+    for index in metadata.tables['task'].indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _replace_transition_state_index(conn, metadata):
+    """(to_state, task_id, created_at) could not range-scan created_at; (to_state, created_at) can"""
+    conn.execute(text("DROP INDEX IF EXISTS ix_task_transition_to_state"))
+    for index in metadata.tables['task_transition'].indexes:
+        index.create(conn, checkfirst=True)
+
+
+UPGRADE_STEPS = [
+    _add_reminder_at,
+    _convert_task_datetimes,
+    _repair_occurrence_foreign_key,
+    _add_updated_at,
+    _add_importance,
+    _add_series_start,
+    _normalize_fsm_states,
+    _create_task_fts,
+    _create_task_indexes,
+    _replace_transition_state_index,
+]
+
+
+def upgrade_schema(engine, metadata):
+    """Bring an existing database up to date with the current models"""
+    with engine.begin() as conn:
+        for step in UPGRADE_STEPS:
+            step(conn, metadata)
+
+
+# Upgrade and query plan checks: a legacy database upgrades with intact foreign keys, and the
+# per-user pages and the overdue sweep are index searches, never table scans
+if __name__ == "__main__":
+    import os
+    import re
+    import sqlite3
+    import tempfile
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import event
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{tmp}/plans.db",
+        'ARCHIVE_DATABASE_URI': f"sqlite:///{tmp}/plans_archive.db",
+        'SHARD_URLS': '',
+        'DEDUPE_STORE': 'memory',
+        'NOTIFY_CHANNEL': 'memory',
+        'PASSWORD_HASH_WORKERS': '0',
+        'PASSWORD_HASH_ITERATIONS': '1000',
+    })
+
+    # The original schema: string times, no reminder_at/updated_at columns
+    legacy = sqlite3.connect(f"{tmp}/plans.db")
+    legacy.executescript("""
+        CREATE TABLE user (id INTEGER NOT NULL, username VARCHAR(100) NOT NULL, email VARCHAR(150) NOT NULL,
+                           password VARCHAR(200) NOT NULL, PRIMARY KEY (id), UNIQUE (username), UNIQUE (email));
+        CREATE TABLE task (id INTEGER NOT NULL, description VARCHAR(200) NOT NULL, remind_time VARCHAR(20) NOT NULL,
+                           reminder_offset INTEGER, status VARCHAR(20), priority VARCHAR(20), repeat VARCHAR(20),
+                           alert_type VARCHAR(20), user_id INTEGER NOT NULL, fsm_state VARCHAR(50),
+                           created_at VARCHAR(20), PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id));
+        INSERT INTO user VALUES (1, 'legacy', 'legacy@example.com', 'x');
+        INSERT INTO task VALUES (1, 'Legacy task', '2025-01-02 09:00', 5, 'Completed', 'Low', 'once', 'both', 1,
+                                 'Task Completed', '2025-01-01 08:00');
+    """)
+    legacy.close()
+
+    import app as tasks_app
+
+    tasks_app.init_db()
+
+    print("=" * 60)
+    print("Legacy database upgrade")
+    print("=" * 60)
+    failures = 0
+    upgraded = sqlite3.connect(f"{tmp}/plans.db")
+    occurrence_sql = upgraded.execute("SELECT sql FROM sqlite_master WHERE name = 'task_occurrence'").fetchone()[0]
+    upgrade_checks = [
+        ("foreign_key_check is clean", upgraded.execute("PRAGMA foreign_key_check").fetchall() == []),
+        ("task_occurrence references task", re.search(r'REFERENCES "?task"? \(id\)', occurrence_sql) is not None),
+        ("no leftover rebuild tables", upgraded.execute(
+            "SELECT name FROM sqlite_master WHERE name IN ('task_new', 'task_legacy')").fetchall() == []),
+        ("times converted, importance scored, updated_at = created_at", upgraded.execute(
+            "SELECT remind_time, importance IS NOT NULL, updated_at FROM task WHERE id = 1").fetchone()
+         == ('2025-01-02 09:00:00.000000', 1, '2025-01-01 08:00:00.000000')),
+    ]
+    upgraded.close()
+    for name, ok in upgrade_checks:
+        failures += not ok
+        print(f"{'ok ' if ok else 'FAIL'} {name}")
+
+    client = tasks_app.app.test_client()
+    client.post('/signup', data={'username': 'plans', 'email': 'plans@example.com', 'password': 'pw'})
+    client.post('/login', data={'email': 'plans@example.com', 'password': 'pw'})
+    due = datetime.now() + timedelta(days=1)
+    day = due.strftime('%Y-%m-%d')
+    for i in range(20):
+        client.post('/add', data={'description': f"Task {i}", 'date': day, 'time': due.strftime('%H:%M'),
+                                  'reminder_offset': '5', 'repeat': 'once', 'alert_type': 'both'})
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and re.search(r'\bFROM task\b', statement):
+            statements.append((statement, parameters))
+
+    engines = (tasks_app.shards.engines[0], tasks_app.read_engine)
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+
+    def plans(action):
+        statements.clear()
+        action()
+        with tasks_app.read_engine.connect() as conn:
+            return [row[3] for statement, parameters in list(statements)
+                    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+    checks = [
+        ("/tasks", lambda: client.get('/tasks'), ['ix_task_user_remind_time']),
+        ("/tasks?status=Pending", lambda: client.get('/tasks?status=Pending'), ['ix_task_user_status_remind_time']),
+        ("/tasks date range", lambda: client.get(f'/tasks?start={day}&end={day}'),
+         ['ix_task_user_remind_time (user_id=? AND remind_time>? AND remind_time<?)']),
+        ("/dashboard", lambda: client.get('/dashboard'), ['ix_task_user_breakdown', 'ix_task_user_remind_time']),
+        ("/check-local-notifications", lambda: client.get('/check-local-notifications'),
+         ['ix_task_user_status_reminder_at']),
+        ("overdue sweep", tasks_app.check_reminders, ['ix_task_status_remind_time']),
+    ]
+
+    print("=" * 60)
+    print("EXPLAIN QUERY PLAN for the task queries")
+    print("=" * 60)
+    for name, action, expected in checks:
+        lines = plans(action)
+        missing = [index for index in expected if not any(index in line for line in lines)]
+        scans = [line for line in lines if re.match(r'SCAN task\b', line)]
+        ok = lines and not missing and not scans
+        failures += not ok
+        print(f"{'ok ' if ok else 'FAIL'} {name}")
+        for line in lines:
+            print(f"       {line}")
+        if missing:
+            print(f"       missing index: {', '.join(missing)}")
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', record)
+    raise SystemExit(1 if failures else 0)
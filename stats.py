@@ -0,0 +1,261 @@
+# stats.py - Dashboard statistics computed with grouped SQL instead of loading every task
+
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from cache import TTLCache
+
+
+def task_breakdown(session, task, user_id):
+    """
+    Count a user's tasks per (status, priority, is_recurring) in one grouped query.
+
+    Args:
+        session: SQLAlchemy session or connection
+        task: the task Table (e.g. Task.__table__)
+        user_id: owner of the tasks
+
+    Returns:
+        Counter keyed by (status, priority, is_recurring)
+    """
+    recurring = task.c.repeat != 'once'
+    rows = session.execute(
+        select(task.c.status, task.c.priority, recurring, func.count())
+        .where(task.c.user_id == user_id)
+        .group_by(task.c.status, task.c.priority, recurring)
+    )
+    return Counter({(status, priority, bool(is_recurring)): count
+                    for status, priority, is_recurring, count in rows})
+
+
+def day_histogram(session, task, user_id, first_day, days=7):
+    """
+    Count a user's tasks per remind_time day in [first_day, first_day + days).
+
+    Returns:
+        Counter keyed by 'YYYY-MM-DD'
+    """
+    start = datetime.combine(first_day, datetime.min.time())
+    day = func.date(task.c.remind_time)
+    rows = session.execute(
+        select(day, func.count())
+        .where(task.c.user_id == user_id,
+               task.c.remind_time >= start,
+               task.c.remind_time < start + timedelta(days=days))
+        .group_by(day)
+    )
+    return Counter({str(day_value): count for day_value, count in rows})
+
+
+def summarize(breakdown, histogram, today, days=7):
+    """Turn the raw counters into the values rendered by dashboard.html"""
+    def count(status=None, priority=None, recurring=None):
+        return sum(n for (s, p, r), n in breakdown.items()
+                   if (status is None or s == status)
+                   and (priority is None or p == priority)
+                   and (recurring is None or r == recurring))
+
+    pending = count(status='Pending')
+    completed = count(status='Completed')
+    overdue = count(status='Overdue')
+
+    # Calculate completion rate (only from completed and overdue, not archived)
+    actionable = completed + overdue
+    labels = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days - 1, -1, -1)]
+
+    return {
+        "total": count(),
+        "pending": pending,
+        "completed": completed,
+        "overdue": overdue,
+        "high_priority": count(status='Pending', priority='High'),
+        "recurring": count(recurring=True),
+        "labels": labels,
+        "chart_data": [histogram.get(label, 0) for label in labels],
+        "priority_data": {p: count(priority=p) for p in ('High', 'Medium', 'Low')},
+        "status_data": {'Pending': pending, 'Completed': completed, 'Overdue': overdue},
+        "completion_rate": round((completed / actionable * 100) if actionable > 0 else 0, 1),
+    }
+
+
+def dashboard_stats(session, task, user_id, today=None, days=7):
+    today = today or datetime.now().date()
+    first_day = today - timedelta(days=days - 1)
+    return summarize(
+        task_breakdown(session, task, user_id),
+        day_histogram(session, task, user_id, first_day, days),
+        today,
+        days
+    )
+
+
+class UserStats:
+    """Raw per-user counters that can be adjusted one task change at a time"""
+
+    __slots__ = ('breakdown', 'histogram', 'today', 'first_day')
+
+    def __init__(self, breakdown, histogram, today, first_day):
+        self.breakdown = breakdown
+        self.histogram = histogram
+        self.today = today
+        self.first_day = first_day
+
+    def apply(self, before, after):
+        """Move one task from its `before` key to its `after` key (either may be None)"""
+        for key, delta in ((before, -1), (after, 1)):
+            if key is None:
+                continue
+            status, priority, recurring, day = key
+            self.breakdown[(status, priority, recurring)] += delta
+            if self.first_day <= day <= self.today.strftime("%Y-%m-%d"):
+                self.histogram[day] += delta
+
+    def __eq__(self, other):
+        return (+self.breakdown == +other.breakdown and +self.histogram == +other.histogram
+                and self.today == other.today)
+
+
+def stats_key(status, priority, repeat, remind_time):
+    """Counter key describing where a single task is counted"""
+    return status, priority, repeat != 'once', remind_time.strftime("%Y-%m-%d")
+
+
+class StatsCache:
+    """
+    Incrementally maintained dashboard counters per user.
+
+    The first read for a user runs the grouped queries; after that every task
+    change is applied as a +1/-1 delta so reads cost O(1). Entries expire after
+    `ttl` seconds (bounding staleness when several processes write), and
+    `reconcile` periodically recomputes cached users to detect drift.
+
+    With an `archive` table, archived tasks are added to the status/priority counts,
+    so moving a task to the archive leaves the cached totals unchanged.
+
+    `scope(user_id)`, if given, is entered around the queries `reconcile` runs for a
+    user outside of that user's request (e.g. to select the user's shard).
+    """
+
+    def __init__(self, session_factory, task, maxsize=1024, ttl=300, days=7, archive=None, scope=None):
+        self.session_factory = session_factory
+        self.task = task
+        self.archive = archive
+        self.scope = scope or (lambda user_id: nullcontext())
+        self.days = days
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _compute(self, user_id, today):
+        session = self.session_factory()
+        first_day = today - timedelta(days=self.days - 1)
+        breakdown = task_breakdown(session, self.task, user_id)
+        if self.archive is not None:
+            # Core selects are not routed to binds; ask the session for the archive table's connection
+            archive = session.connection(bind_arguments={'clause': self.archive})
+            breakdown += task_breakdown(archive, self.archive, user_id)
+        return UserStats(
+            breakdown,
+            day_histogram(session, self.task, user_id, first_day, self.days),
+            today,
+            first_day.strftime("%Y-%m-%d")
+        )
+
+    def get(self, user_id, today=None):
+        """Dashboard values for a user, computing and caching the counters on a miss"""
+        today = today or datetime.now().date()
+        entry = self.cache.get(user_id)
+        if entry is None or entry.today != today:
+            entry = self._compute(user_id, today)
+            self.cache.set(user_id, entry)
+        with self.cache.lock:
+            return summarize(entry.breakdown, entry.histogram, today, self.days)
+
+    def record(self, user_id, before=None, after=None):
+        """Apply one committed task change; users without a cached entry are left alone"""
+        with self.cache.lock:
+            entry = self.cache.peek(user_id)
+            if entry is not None:
+                entry.apply(before, after)
+
+    def invalidate(self, user_id):
+        self.cache.invalidate(user_id)
+
+    def reconcile(self):
+        """Recompute every cached user and replace entries that drifted; returns the drift count"""
+        drifted = 0
+        for user_id in self.cache.keys():
+            entry = self.cache.peek(user_id)
+            if entry is None:
+                continue
+            with self.scope(user_id):
+                fresh = self._compute(user_id, entry.today)
+            with self.cache.lock:
+                if self.cache.peek(user_id) is entry and entry != fresh:
+                    drifted += 1
+                    self.cache.set(user_id, fresh)
+        if drifted:
+            print(f"[Stats] ⚠️ Reconciled drifted counters for {drifted} users")
+        return drifted
+
+    def stats(self):
+        return self.cache.stats()
+
+
+# Benchmark: dashboard latency as a user's task count grows
+if __name__ == "__main__":
+    import random
+    import time
+    from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table,
+                            create_engine, insert)
+
+    metadata = MetaData()
+    task_table = Table(
+        'task', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('remind_time', DateTime, nullable=False),
+        Column('status', String(20)),
+        Column('priority', String(20)),
+        Column('repeat', String(20)),
+        Column('user_id', Integer, nullable=False),
+        Index('ix_task_user_status_remind_time', 'user_id', 'status', 'remind_time'),
+        Index('ix_task_user_breakdown', 'user_id', 'status', 'priority', 'repeat'),
+    )
+
+    def legacy_dashboard(conn, user_id, today):
+        # The original approach: hydrate every row, then filter in Python
+        rows = conn.execute(select(task_table).where(task_table.c.user_id == user_id)).all()
+        counts = [len([r for r in rows if r.status == s]) for s in ('Pending', 'Completed', 'Overdue')]
+        counts += [len([r for r in rows if r.priority == p]) for p in ('High', 'Medium', 'Low')]
+        for i in range(7):
+            start = datetime.combine(today - timedelta(days=i), datetime.min.time())
+            conn.execute(select(func.count()).where(task_table.c.user_id == user_id,
+                                                    task_table.c.remind_time >= start,
+                                                    task_table.c.remind_time < start + timedelta(days=1))).scalar()
+        return counts
+
+    print("=" * 60)
+    print("Dashboard latency by task count (ms)")
+    print("=" * 60)
+    today = datetime.now().date()
+    for size in (1_000, 10_000, 50_000):
+        engine = create_engine('sqlite://')
+        metadata.create_all(engine)
+        now = datetime.now()
+        with engine.begin() as conn:
+            conn.execute(insert(task_table), [{
+                'remind_time': now + timedelta(minutes=random.randint(-20000, 20000)),
+                'status': random.choice(['Pending', 'Completed', 'Overdue', 'Archived']),
+                'priority': random.choice(['High', 'Medium', 'Low']),
+                'repeat': random.choice(['once', 'once', 'daily']),
+                'user_id': 1,
+            } for _ in range(size)])
+
+        with engine.connect() as conn:
+            for label, fn in (("legacy", lambda: legacy_dashboard(conn, 1, today)),
+                              ("grouped", lambda: dashboard_stats(conn, task_table, 1, today))):
+                start = time.perf_counter()
+                for _ in range(5):
+                    fn()
+                print(f"{size:>7} tasks  {label:<8} {(time.perf_counter() - start) / 5 * 1000:8.2f}")
@@ -0,0 +1,227 @@
+# transitions.py - Append-only log of task FSM transitions
+#
+# Transitions are buffered in memory and appended to the log table in batches by a
+# background thread, so request handlers never wait on the extra INSERT. Old log
+# rows are periodically folded into one snapshot row per task and deleted; a task's
+# history is replayed from its snapshot plus the log rows written after it.
+
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, select
+
+
+class TransitionLog:
+    """
+    In-memory buffer in front of the transition log table.
+
+    Args:
+        write_batch: callable that inserts and commits a list of row dicts
+        flush_interval: seconds between flushes when the buffer is not full
+        batch_size: rows written per INSERT; a full batch wakes the writer early
+        max_buffer: rows kept while the database is unavailable; older rows are dropped beyond it
+    """
+
+    def __init__(self, write_batch, flush_interval=2, batch_size=500, max_buffer=100000):
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self._buffer = deque()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def record(self, task_id, from_state, event, to_state, at=None):
+        """Queue one transition; cheap enough to call from request handlers"""
+        self._buffer.append({
+            'task_id': task_id,
+            'from_state': from_state,
+            'event': event,
+            'to_state': to_state,
+            'created_at': at or datetime.now(),
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def extend(self, transitions, at=None):
+        """Queue many (task_id, from_state, event, to_state) transitions"""
+        at = at or datetime.now()
+        for task_id, from_state, event, to_state in transitions:
+            self.record(task_id, from_state, event, to_state, at)
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows written"""
+        written = 0
+        with self._flush_lock:
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+                try:
+                    self.write_batch(batch)
+                except Exception as e:
+                    # Put the batch back in order and retry on the next flush
+                    self._buffer.extendleft(reversed(batch))
+                    overflow = len(self._buffer) - self.max_buffer
+                    for _ in range(max(overflow, 0)):
+                        self._buffer.popleft()
+                    self.dropped += max(overflow, 0)
+                    self.failures += 1
+                    print(f"[Transitions] ❌ Could not write {len(batch)} transitions: {e}")
+                    break
+                written += len(batch)
+        self.written += written
+        return written
+
+    def start(self):
+        if self._thread:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='transition-log', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer and flush whatever is left"""
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+def compact(session, log, snapshot, before):
+    """
+    Fold log rows older than `before` into one snapshot row per task, then delete them.
+
+    Returns:
+        number of log rows folded
+    """
+    folded = session.execute(
+        select(log.c.task_id, func.max(log.c.id), func.count())
+        .where(log.c.created_at < before)
+        .group_by(log.c.task_id)
+    ).all()
+    if not folded:
+        return 0
+
+    last_ids = {task_id: last_id for task_id, last_id, _ in folded}
+    counts = {task_id: count for task_id, _, count in folded}
+    last_rows = {}
+    existing = {}
+    task_ids = list(last_ids)
+    for i in range(0, len(task_ids), 500):
+        chunk = task_ids[i:i + 500]
+        for row in session.execute(
+            select(log.c.task_id, log.c.to_state, log.c.created_at)
+            .where(log.c.id.in_([last_ids[task_id] for task_id in chunk]))
+        ):
+            last_rows[row.task_id] = row
+        for row in session.execute(select(snapshot).where(snapshot.c.task_id.in_(chunk))):
+            existing[row.task_id] = row
+
+    inserts, updates = [], []
+    for task_id, last in last_rows.items():
+        values = {
+            'state': last.to_state,
+            'entered_at': last.created_at,
+            'last_log_id': last_ids[task_id],
+            'transitions': counts[task_id] + (existing[task_id].transitions if task_id in existing else 0),
+        }
+        if task_id in existing:
+            updates.append({'b_task_id': task_id, **values})
+        else:
+            inserts.append({'task_id': task_id, **values})
+
+    if inserts:
+        session.execute(snapshot.insert(), inserts)
+    if updates:
+        session.execute(
+            snapshot.update().where(snapshot.c.task_id == bindparam('b_task_id')),
+            updates
+        )
+    session.execute(
+        log.delete().where(log.c.created_at < before, log.c.id <= max(last_ids.values()))
+    )
+    return sum(counts.values())
+
+
+def replay(session, log, snapshot, task_id):
+    """
+    Rebuild a task's state from its snapshot plus the log rows written after it.
+
+    Returns:
+        dict with the current state, the snapshot used (if any) and the remaining transitions
+    """
+    snap = session.execute(select(snapshot).where(snapshot.c.task_id == task_id)).first()
+    query = select(log.c.from_state, log.c.event, log.c.to_state, log.c.created_at).where(log.c.task_id == task_id)
+    if snap:
+        query = query.where(log.c.id > snap.last_log_id)
+
+    state = snap.state if snap else 'Idle'
+    transitions = []
+    for row in session.execute(query.order_by(log.c.id)):
+        transitions.append({
+            'from': row.from_state,
+            'event': row.event,
+            'to': row.to_state,
+            'at': row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        state = row.to_state
+
+    return {
+        'task_id': task_id,
+        'state': state,
+        'snapshot': {
+            'state': snap.state,
+            'entered_at': snap.entered_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'transitions': snap.transitions,
+        } if snap else None,
+        'transitions': transitions,
+    }
+
+
+def average_time_between(session, log, from_state, to_state, since=None):
+    """
+    Average seconds from entering `from_state` to next reaching `to_state` on the same task,
+    e.g. Reminder Sent -> Task Completed. The outer scan is a range of the (to_state, created_at)
+    index and each follow-up is an index seek on the task's own rows (task_id, id).
+    """
+    entered = log.alias('entered')
+    reached = log.alias('reached')
+    reached_at = (
+        select(func.min(reached.c.created_at))
+        .where(reached.c.to_state == to_state,
+               reached.c.task_id == entered.c.task_id,
+               reached.c.id > entered.c.id)
+        .scalar_subquery()
+    )
+    query = select(entered.c.created_at, reached_at).where(entered.c.to_state == from_state)
+    if since:
+        query = query.where(entered.c.created_at >= since)
+
+    durations = [(done - start).total_seconds() for start, done in session.execute(query) if done]
+    return {
+        'count': len(durations),
+        'average_seconds': round(sum(durations) / len(durations), 1) if durations else None,
+    }
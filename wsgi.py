@@ -0,0 +1,10 @@
+# wsgi.py - Production entry point, e.g. `gunicorn wsgi:app`
+#
+# gunicorn.conf.py sets threaded workers so open SSE streams don't use up the
+# workers. Each worker imports this module, so each one starts its own background
+# services; the scheduler lease makes sure only one of them runs the periodic jobs.
+
+from app import app, start_background_services
+
+# Schema setup (`flask init-db`) runs once, in gunicorn's on_starting hook
+start_background_services()